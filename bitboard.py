@@ -0,0 +1,301 @@
+from constant import *
+from piece import *
+from board import Board
+
+# square index = row * 8 + col (a8 = 0, h1 = 63), one bit per square
+FULL = (1 << 64) - 1
+
+PIECE_TYPES = {Pawn: 'P', Knight: 'N', Bishop: 'B', Rook: 'R', Queen: 'Q', King: 'K'}
+
+
+def square(pos):
+    col, row = pos
+    return row * COLS + col
+
+def square_pos(sq):
+    return (sq % COLS, sq // COLS)
+
+SQUARE_POS = [square_pos(sq) for sq in range(ROWS * COLS)]
+
+def bit_positions(bb):
+    '''return list of positions of set bits'''
+    positions = []
+    while bb:
+        low = bb & -bb
+        positions.append(SQUARE_POS[low.bit_length() - 1])
+        bb ^= low
+    return positions
+
+
+def _step_table(steps):
+    '''attack table for pieces that jump a single step'''
+    table = []
+    for sq in range(ROWS * COLS):
+        col, row = square_pos(sq)
+        bb = 0
+        for d_row, d_col in steps:
+            r, c = row + d_row, col + d_col
+            if 0 <= c < COLS and 0 <= r < ROWS:
+                bb |= 1 << (r * COLS + c)
+        table.append(bb)
+    return table
+
+def _ray_attacks(sq, occupied, steps):
+    '''squares a slider on sq attacks along steps, stopping at the first occupied square (slow, used to fill tables)'''
+    col, row = square_pos(sq)
+    bb = 0
+    for d_row, d_col in steps:
+        r, c = row + d_row, col + d_col
+        while 0 <= c < COLS and 0 <= r < ROWS:
+            bb |= 1 << (r * COLS + c)
+            if occupied & (1 << (r * COLS + c)):
+                break
+            r += d_row
+            c += d_col
+    return bb
+
+def _line_table(steps):
+    '''
+    attacks along a line through each square, indexed by [sq][occupancy & LINE_MASK[sq]]
+
+    the mask leaves out the last square of each ray - a piece there does not change the attacks,
+    so a line has at most 6 relevant squares and 64 occupancies per square
+    '''
+    masks, table = [], []
+    for sq in range(ROWS * COLS):
+        col, row = square_pos(sq)
+        mask = 0
+        for d_row, d_col in steps:
+            r, c = row + d_row, col + d_col
+            while 0 <= c + d_col < COLS and 0 <= r + d_row < ROWS:  # last square of the ray left out
+                mask |= 1 << (r * COLS + c)
+                r += d_row
+                c += d_col
+        attacks = {}
+        occupied = 0
+        while True:  # every subset of mask
+            attacks[occupied] = _ray_attacks(sq, occupied, steps)
+            occupied = (occupied - mask) & mask
+            if occupied == 0:
+                break
+        masks.append(mask)
+        table.append(attacks)
+    return masks, table
+
+def _between_table():
+    '''squares strictly between 2 squares on a line, indexed by [sq][sq], 0 if not on a line'''
+    table = [[0] * (ROWS * COLS) for _ in range(ROWS * COLS)]
+    for sq in range(ROWS * COLS):
+        col, row = square_pos(sq)
+        for d_row, d_col in QUEEN_STEPS:
+            between = 0
+            r, c = row + d_row, col + d_col
+            while 0 <= c < COLS and 0 <= r < ROWS:
+                table[sq][r * COLS + c] = between
+                between |= 1 << (r * COLS + c)
+                r += d_row
+                c += d_col
+    return table
+
+def _rank_table():
+    '''attacks along a single rank, indexed by [col][8 bit occupancy of rank]'''
+    table = []
+    for col in range(COLS):
+        attacks = []
+        for occ in range(256):
+            bb = 0
+            for step in (1, -1):
+                c = col + step
+                while 0 <= c < COLS:
+                    bb |= 1 << c
+                    if occ & (1 << c):
+                        break
+                    c += step
+            attacks.append(bb)
+        table.append(attacks)
+    return table
+
+
+KNIGHT_ATTACKS = _step_table(KNIGHT_STEPS)
+KING_ATTACKS = _step_table(KING_STEPS)
+PAWN_ATTACKS = {'W': _step_table([(-1, -1), (-1, +1)]),  # white pawns capture towards row 0
+                'B': _step_table([(+1, -1), (+1, +1)])}
+
+FILE_MASKS, FILE_ATTACKS = _line_table([(1, 0), (-1, 0)])
+DIAGONAL_MASKS, DIAGONAL_ATTACKS = _line_table([(1, 1), (-1, -1)])
+ANTI_DIAGONAL_MASKS, ANTI_DIAGONAL_ATTACKS = _line_table([(1, -1), (-1, 1)])
+RANK_ATTACKS = _rank_table()
+BETWEEN = _between_table()
+
+PAWN_START_ROWS = {'W': 0xFF << (6 * COLS), 'B': 0xFF << COLS}
+
+
+def rank_attacks(sq, occupied):
+    shift = sq - sq % COLS
+    return RANK_ATTACKS[sq % COLS][(occupied >> shift) & 0xFF] << shift
+
+def rook_attacks(sq, occupied):
+    return rank_attacks(sq, occupied) | FILE_ATTACKS[sq][occupied & FILE_MASKS[sq]]
+
+def bishop_attacks(sq, occupied):
+    return (DIAGONAL_ATTACKS[sq][occupied & DIAGONAL_MASKS[sq]]
+            | ANTI_DIAGONAL_ATTACKS[sq][occupied & ANTI_DIAGONAL_MASKS[sq]])
+
+ROOK_RAYS = [rook_attacks(sq, 0) for sq in range(ROWS * COLS)]  # empty board
+BISHOP_RAYS = [bishop_attacks(sq, 0) for sq in range(ROWS * COLS)]
+
+
+class BitBoard(Board):
+    '''
+    Board backend that keeps a 64 bit integer per piece type and colour next to the 8x8 list
+
+    get_piece still reads the 8x8 list (pieces are needed by Game). moves, attacks, pins, checks
+    and evasions are worked out on the bitboards, squares are only turned into positions once per
+    piece at the end (get_safe_moves)
+    '''
+    def __init__(self, fen=None, position=None):
+        self.bitboards = {colour: {t: 0 for t in PIECE_TYPES.values()} for colour in ('W', 'B')}
+        self.occupied = {'W': 0, 'B': 0}
+        super().__init__(fen, position)
+
+    def _toggle(self, piece, pos):
+        bit = 1 << square(pos)
+        self.bitboards[piece.colour][PIECE_TYPES[type(piece)]] ^= bit
+        self.occupied[piece.colour] ^= bit
+
+    def add_piece(self, piece):
+        super().add_piece(piece)
+        self._toggle(piece, piece.get_pos())
+
+    def remove_piece(self, piece):
+        super().remove_piece(piece)
+        self._toggle(piece, piece.get_pos())
+
+    def move(self, piece, new_pos):
+        captured = self.get_piece(new_pos)
+        if captured != 0:
+            self._toggle(captured, new_pos)
+        self._toggle(piece, piece.get_pos())
+        super().move(piece, new_pos)
+        self._toggle(piece, new_pos)
+
+
+    def get_attacks(self, piece):
+        '''return bitboard of squares attacked by piece'''
+        sq = square(piece.get_pos())
+        piece_type = PIECE_TYPES[type(piece)]
+        if piece_type == 'P':
+            return PAWN_ATTACKS[piece.colour][sq]
+        if piece_type == 'N':
+            return KNIGHT_ATTACKS[sq]
+        if piece_type == 'K':
+            return KING_ATTACKS[sq]
+
+        occupied = self.occupied['W'] | self.occupied['B']
+        if piece_type == 'R':
+            return rook_attacks(sq, occupied)
+        if piece_type == 'B':
+            return bishop_attacks(sq, occupied)
+        return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+
+    def get_moves_bb(self, piece):
+        '''return bitboard of standard moves that piece can make'''
+        colour = piece.colour
+        enemy = self.occupied[get_opposite_colour(colour)]
+
+        if isinstance(piece, Pawn):
+            bit = 1 << square(piece.get_pos())
+            empty = ~(self.occupied['W'] | self.occupied['B']) & FULL
+            if colour == 'W':
+                push = (bit >> COLS) & empty
+                double = ((push & (PAWN_START_ROWS['W'] >> COLS)) >> COLS) & empty
+            else:
+                push = (bit << COLS) & empty
+                double = ((push & (PAWN_START_ROWS['B'] << COLS)) << COLS) & empty
+            return push | double | (self.get_attacks(piece) & enemy)
+
+        return self.get_attacks(piece) & ~self.occupied[colour]
+
+    def get_moves(self, piece):
+        return bit_positions(self.get_moves_bb(piece))
+
+
+    def is_square_attacked(self, pos, by_colour, empty=None):
+        occupied = self.occupied['W'] | self.occupied['B']
+        if empty is not None:
+            occupied &= ~(1 << square(empty))
+        return self.is_attacked(square(pos), by_colour, occupied)
+
+    def is_attacked(self, sq, by_colour, occupied):
+        '''see if square (index) attacked by specified colour with occupied squares (bitboard) blocking sliders'''
+        bbs = self.bitboards[by_colour]
+
+        # pawn attacks are symmetric - look from the square as a pawn of the other colour
+        if PAWN_ATTACKS[get_opposite_colour(by_colour)][sq] & bbs['P']:
+            return True
+        if KNIGHT_ATTACKS[sq] & bbs['N'] or KING_ATTACKS[sq] & bbs['K']:
+            return True
+        if rook_attacks(sq, occupied) & (bbs['R'] | bbs['Q']):
+            return True
+        if bishop_attacks(sq, occupied) & (bbs['B'] | bbs['Q']):
+            return True
+        return False
+
+
+    def get_pins_and_checks(self, colour):
+        '''
+        Board.get_pins_and_checks from the bitboards - same tuple, squares as bitboards
+
+        pins - square (index) of pinned piece -> bitboard it can still move to
+        check_mask - bitboard of squares that capture or block the checking piece, FULL if not in check
+        '''
+        king_sq = square(self.kings[colour].get_pos())
+        enemy = self.bitboards[get_opposite_colour(colour)]
+        own = self.occupied[colour]
+        occupied = own | self.occupied[get_opposite_colour(colour)]
+        rooks = enemy['R'] | enemy['Q']
+        bishops = enemy['B'] | enemy['Q']
+
+        # pawn attacks are symmetric - enemy pawns on squares a pawn of colour would attack from the king
+        checkers = (KNIGHT_ATTACKS[king_sq] & enemy['N'] | PAWN_ATTACKS[colour][king_sq] & enemy['P']
+                    | rook_attacks(king_sq, occupied) & rooks | bishop_attacks(king_sq, occupied) & bishops)
+
+        # sliders lined up with the king with a single own piece between them
+        pins = {}
+        snipers = ROOK_RAYS[king_sq] & rooks | BISHOP_RAYS[king_sq] & bishops
+        while snipers:
+            sniper = snipers & -snipers
+            snipers ^= sniper
+            between = BETWEEN[king_sq][sniper.bit_length() - 1]
+            blockers = between & occupied
+            if blockers & own and not blockers & (blockers - 1):
+                pins[blockers.bit_length() - 1] = between | sniper
+
+        if not checkers:
+            return pins, 0, FULL
+        if checkers & (checkers - 1):
+            return pins, 2, FULL  # double check - only king can move
+        return pins, 1, checkers | BETWEEN[king_sq][checkers.bit_length() - 1]
+
+    def get_safe_moves(self, piece, pins_and_checks):
+        pins, checks, check_mask = pins_and_checks
+        sq = square(piece.get_pos())
+
+        if isinstance(piece, King):
+            opp_colour = get_opposite_colour(piece.colour)
+            occupied = (self.occupied['W'] | self.occupied['B']) ^ (1 << sq)  # king does not block rays behind it
+            moves = KING_ATTACKS[sq] & ~self.occupied[piece.colour]
+            safe = 0
+            while moves:
+                move = moves & -moves
+                moves ^= move
+                if not self.is_attacked(move.bit_length() - 1, opp_colour, occupied):
+                    safe |= move
+            return bit_positions(safe)
+
+        if checks > 1:
+            return []
+        moves = self.get_moves_bb(piece) & check_mask
+        if sq in pins:
+            moves &= pins[sq]
+        return bit_positions(moves)
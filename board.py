@@ -1,14 +1,51 @@
-import pygame
 from constant import *
 from piece import *
-from copy import deepcopy
+from move import Move
+from zobrist import piece_key, castling_key, en_passant_key, TURN_KEY
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+FEN_PIECES = {'P': Pawn, 'N': Knight, 'B': Bishop, 'R': Rook, 'Q': Queen, 'K': King}
+FEN_LETTERS = {piece_class: letter for letter, piece_class in FEN_PIECES.items()}
+FEN_CHARS = {**{letter: (piece_class, 'W') for letter, piece_class in FEN_PIECES.items()},
+             **{letter.lower(): (piece_class, 'B') for letter, piece_class in FEN_PIECES.items()}}
+FEN_EMPTY = {str(n): n for n in range(1, COLS + 1)}  # digit -> number of empty squares
+
+# square -> castling rights lost when a piece moves from / to it (king and rook start squares)
+CASTLING_SQUARES = {(4, ROWS - 1): 'KQ', (COLS - 1, ROWS - 1): 'K', (0, ROWS - 1): 'Q',
+                    (4, 0): 'kq', (COLS - 1, 0): 'k', (0, 0): 'q'}
+
+# byte snapshot of a position (see get_position) - piece code of a square is type | BLACK_CODE | MOVED_CODE, 0 if empty.
+# only a transfer format: moves are still made / generated on the 8x8 list of Piece objects
+PIECE_CODES = {Pawn: 1, Knight: 2, Bishop: 3, Rook: 4, Queen: 5, King: 6}
+CODE_PIECES = {code: piece_class for piece_class, code in PIECE_CODES.items()}
+BLACK_CODE = 8
+MOVED_CODE = 16  # move_num > 0 (pawn can not move 2 squares)
+CASTLING_BITS = {'K': 1, 'Q': 2, 'k': 4, 'q': 8}
+NO_SQUARE = 255
+POSITION_SIZE = ROWS * COLS + 6  # squares, turn, castling, en passant, halfmove clock, fullmove number (2)
 
 
 class Board:
-    def __init__(self):
+    def __init__(self, fen=None, position=None):
+        '''fen / position: position to set up (see set_fen / set_position), starting position if both None'''
         self.board = [[0 for _ in range(COLS)] for _ in range(ROWS)]
         self.turn = 'W'  # colour
-        self.create_board()
+        self.kings = {}  # colour -> king
+        self.pieces = {'W': [], 'B': []}  # colour -> pieces still on board
+        self.castling = ''  # castling rights left, subset of KQkq
+        self.en_passant_pos = None  # pos of square passed by pawn that moved 2 squares on the last move
+        self.halfmove_clock = 0  # moves since last capture or pawn move (50 move rule)
+        self.fullmove_number = 1  # starts at 1, incremented after black moves
+        self.hash = 0  # zobrist key of position, updated on every move
+        if position is not None:
+            self.set_position(position)
+        elif fen is not None:
+            self.set_fen(fen)
+        else:
+            self.create_board()
+            self.castling = 'KQkq'
+            self.hash = self.compute_hash()
 
     def get_piece(self, pos):
         col, row = pos
@@ -17,47 +54,395 @@ class Board:
     def get_board(self):
         return self.board
 
+    def get_hash(self):
+        return self.hash
+
     def get_king(self, colour):
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.get_piece((col, row))
-                if isinstance(piece, King):
-                    if piece.colour == colour:
-                        king = piece
-                        king.set_pos((col, row))
-        return king
+        return self.kings[colour]
+
+    def get_pieces(self, colour):
+        '''return pieces of specified colour still on board'''
+        return self.pieces[colour]
+
+    def has_one_king_each(self):
+        '''see if each colour has exactly one king (kings holds one per colour)'''
+        return all(sum(isinstance(piece, King) for piece in self.pieces[colour]) == 1 for colour in ('W', 'B'))
+
+    def get_moves(self, piece):
+        '''return list of standard moves that piece can make'''
+        return piece.get_moves(self.board)
 
     def get_all_moves(self, colour):
         '''return all standard move that can be made by all pieces of specified colour'''
         all_moves = []
-        for row in self.board:
-            for piece in row:
-                if piece != 0:
-                    if piece.colour == colour:
-                        all_moves.extend(piece.get_moves(self.board))
+        for piece in self.pieces[colour]:
+            all_moves.extend(self.get_moves(piece))
         return all_moves
 
 
+    def add_piece(self, piece):
+        '''place piece on its square and add it to the piece index'''
+        col, row = piece.get_pos()
+        self.board[row][col] = piece
+        self.pieces[piece.colour].append(piece)
+        self.hash ^= piece_key(piece, (col, row))
+        if isinstance(piece, King):
+            self.kings[piece.colour] = piece
+
+    def remove_piece(self, piece):
+        '''set square of piece to empty (0) and remove it from the piece index'''
+        col, row = piece.get_pos()
+        self.board[row][col] = 0
+        self.pieces[piece.colour].remove(piece)
+        self.hash ^= piece_key(piece, (col, row))
+
+
     def move(self, piece, new_pos):
         '''move piece - old pos -> new pos, set old pos to empty (0)'''
         curr_col, curr_row = piece.get_pos()
         new_col, new_row = new_pos
 
+        captured = self.board[new_row][new_col]
+        if captured != 0:
+            self.pieces[captured.colour].remove(captured)
+            self.hash ^= piece_key(captured, new_pos)
+
         self.board[curr_row][curr_col], self.board[new_row][new_col] = 0, self.board[curr_row][curr_col]
         piece.move(new_pos)
+        self.hash ^= piece_key(piece, (curr_col, curr_row)) ^ piece_key(piece, new_pos)
 
 
     def is_check(self, colour):
         '''see if king of specified colour in check'''
-        king = self.get_king(colour)        
-        all_moves = self.get_all_moves(get_opposite_colour(colour))
-        if king.get_pos() in all_moves:
-            return True
+        king = self.get_king(colour)
+        return self.is_square_attacked(king.get_pos(), get_opposite_colour(colour))
+
+
+    def is_square_attacked(self, pos, by_colour, empty=None):
+        '''
+        see if any piece of specified colour attacks square - scan outward from the square
+
+        empty: square treated as empty, e.g. king moving away so it cannot block a ray behind it
+        '''
+        if empty is not None:
+            e_col, e_row = empty
+            piece = self.board[e_row][e_col]
+            self.board[e_row][e_col] = 0
+            attacked = self.is_square_attacked(pos, by_colour)
+            self.board[e_row][e_col] = piece
+            return attacked
+
+        col, row = pos
+        board = self.board
+
+        # pawns - attacking pawn is one row behind the square (relative to its colour)
+        pawn_row = row + 1 if by_colour == 'W' else row - 1
+        if 0 <= pawn_row < ROWS:
+            for pawn_col in (col - 1, col + 1):
+                if 0 <= pawn_col < COLS:
+                    piece = board[pawn_row][pawn_col]
+                    if piece != 0 and piece.colour == by_colour and isinstance(piece, Pawn):
+                        return True
+
+        # knights / king - single jumps
+        for steps, attacker in ((KNIGHT_STEPS, Knight), (KING_STEPS, King)):
+            for d_row, d_col in steps:
+                r, c = row + d_row, col + d_col
+                if 0 <= c < COLS and 0 <= r < ROWS:
+                    piece = board[r][c]
+                    if piece != 0 and piece.colour == by_colour and isinstance(piece, attacker):
+                        return True
+
+        # rooks / bishops / queens - slide along ray until blocked
+        for steps, attacker in ((ROOK_STEPS, Rook), (BISHOP_STEPS, Bishop)):
+            for d_row, d_col in steps:
+                r, c = row + d_row, col + d_col
+                while 0 <= c < COLS and 0 <= r < ROWS:
+                    piece = board[r][c]
+                    if piece != 0:
+                        if piece.colour == by_colour and isinstance(piece, (attacker, Queen)):
+                            return True
+                        break
+                    r += d_row
+                    c += d_col
+
         return False
 
 
+    def get_pins_and_checks(self, colour):
+        '''
+        scan outward from king of specified colour
+
+        returns: (pins, checks, check_mask)
+        pins - pos of pinned piece -> squares it can still move to (along the pin, pinning piece included)
+        checks - number of pieces giving check
+        check_mask - squares that capture or block the checking piece
+        '''
+        king_col, king_row = self.kings[colour].get_pos()
+        opp_colour = get_opposite_colour(colour)
+        board = self.board
+        pins = {}
+        checks = 0
+        check_mask = set()
+
+        # rooks / bishops / queens
+        for steps, attacker in ((ROOK_STEPS, Rook), (BISHOP_STEPS, Bishop)):
+            for d_row, d_col in steps:
+                ray = []
+                pinned = None
+                r, c = king_row + d_row, king_col + d_col
+                while 0 <= c < COLS and 0 <= r < ROWS:
+                    ray.append((c, r))
+                    piece = board[r][c]
+                    if piece != 0:
+                        if piece.colour == colour:
+                            if pinned is not None:  # 2 own pieces - no pin
+                                break
+                            pinned = piece
+                        else:
+                            if isinstance(piece, (attacker, Queen)):
+                                if pinned is None:
+                                    checks += 1
+                                    check_mask.update(ray)
+                                else:
+                                    pins[pinned.get_pos()] = set(ray)
+                            break
+                    r += d_row
+                    c += d_col
+
+        # knights
+        for d_row, d_col in KNIGHT_STEPS:
+            r, c = king_row + d_row, king_col + d_col
+            if 0 <= c < COLS and 0 <= r < ROWS:
+                piece = board[r][c]
+                if piece != 0 and piece.colour == opp_colour and isinstance(piece, Knight):
+                    checks += 1
+                    check_mask.add((c, r))
+
+        # pawns - attacking pawn is one row ahead of king (relative to king colour)
+        pawn_row = king_row - 1 if colour == 'W' else king_row + 1
+        if 0 <= pawn_row < ROWS:
+            for c in (king_col - 1, king_col + 1):
+                if 0 <= c < COLS:
+                    piece = board[pawn_row][c]
+                    if piece != 0 and piece.colour == opp_colour and isinstance(piece, Pawn):
+                        checks += 1
+                        check_mask.add((c, pawn_row))
+
+        return pins, checks, check_mask
+
+    def get_safe_moves(self, piece, pins_and_checks):
+        '''
+        return list of standard moves of piece that leave own king safe (no castling / en passant)
+
+        pins_and_checks: get_pins_and_checks of colour of piece
+        '''
+        pins, checks, check_mask = pins_and_checks
+
+        # king cannot move to attacked square (king removed so it does not block rays behind it)
+        if isinstance(piece, King):
+            opp_colour = get_opposite_colour(piece.colour)
+            king_pos = piece.get_pos()
+            return [pos for pos in self.get_moves(piece) if not self.is_square_attacked(pos, opp_colour, empty=king_pos)]
+
+        # double check - only king can move
+        if checks > 1:
+            return []
+
+        # king in check -> block or capture checking piece, pin pieces -> stay on pin ray
+        moves = self.get_moves(piece)
+        if checks:
+            moves = [pos for pos in moves if pos in check_mask]
+        pin_ray = pins.get(piece.get_pos())
+        if pin_ray is not None:
+            moves = [pos for pos in moves if pos in pin_ray]
+        return moves
+
+
+    def get_castling_rights(self):
+        '''return castling rights left (subset of KQkq)'''
+        return self.castling
+
+    def get_en_passant_pos(self):
+        '''return pos of square a pawn can capture en passant to (None if last move was no 2 square pawn move)'''
+        return self.en_passant_pos
+
+    def get_en_passant_col(self):
+        if self.en_passant_pos is None:
+            return None
+        return self.en_passant_pos[0]
+
+    def compute_hash(self):
+        '''compute zobrist key of position from scratch'''
+        key = 0
+        for colour in self.pieces:
+            for piece in self.pieces[colour]:
+                key ^= piece_key(piece, piece.get_pos())
+        if self.turn == 'B':
+            key ^= TURN_KEY
+        return key ^ castling_key(self.get_castling_rights()) ^ en_passant_key(self.get_en_passant_col())
+
+    def clear(self):
+        '''remove every piece, hash is left at 0'''
+        for colour in ('W', 'B'):
+            for piece in list(self.pieces[colour]):
+                self.remove_piece(piece)
+        self.kings = {}
+        self.hash = 0
+
+
+    def set_fen(self, fen):
+        '''
+        replace position with FEN string - placement, side to move, castling, en passant, clocks
+        (clocks may be left out)
+        '''
+        fields = fen.split()
+        if len(fields) not in (4, 6):
+            raise ValueError(f'invalid FEN: {fen}')
+        placement, turn, castling, en_passant = fields[:4]
+        ranks = placement.split('/')
+        if len(ranks) != ROWS or turn not in ('w', 'b'):
+            raise ValueError(f'invalid FEN: {fen}')
+
+        self.clear()  # add_piece xors in key of every piece, rest added at the end
+        for row, rank in enumerate(ranks):
+            col = 0
+            for char in rank:
+                if char in FEN_EMPTY:
+                    col += FEN_EMPTY[char]
+                    continue
+                if char not in FEN_CHARS or col >= COLS:
+                    raise ValueError(f'invalid FEN: {fen}')
+                piece_class, colour = FEN_CHARS[char]
+                if piece_class is Pawn and row in (0, ROWS - 1):
+                    raise ValueError(f'invalid FEN (pawn on first / last rank): {fen}')
+                piece = piece_class(col, row, colour)
+                if isinstance(piece, Pawn):
+                    start_row = ROWS - 2 if colour == 'W' else 1
+                    piece.move_num = 0 if row == start_row else 1
+                self.add_piece(piece)
+                col += 1
+            if col != COLS:
+                raise ValueError(f'invalid FEN: {fen}')
+        if not self.has_one_king_each():
+            raise ValueError(f'invalid FEN (one king of each colour needed): {fen}')
+
+        # castling right kept only with king and rook on their start squares
+        self.castling = ''
+        for right in 'KQkq':
+            colour, row = ('W', ROWS - 1) if right.isupper() else ('B', 0)
+            king, rook = self.board[row][4], self.board[row][COLS - 1 if right in 'Kk' else 0]
+            if (right in castling and isinstance(king, King) and isinstance(rook, Rook)
+                    and king.colour == rook.colour == colour):
+                self.castling += right
+
+        # en passant square kept only with pawn (of side that just moved) that moved 2 squares in front of it
+        self.en_passant_pos = None
+        if en_passant != '-':
+            ep_rank = '6' if turn == 'w' else '3'  # square passed by pawn of side that just moved
+            if len(en_passant) != 2 or en_passant[0] not in 'abcdefgh' or en_passant[1] != ep_rank:
+                raise ValueError(f'invalid FEN (en passant square): {fen}')
+            col, row = convert_to_pos(en_passant)
+            direction = -1 if row == 2 else 1  # black pawn moved to row 3, white pawn to row 4
+            pawn = self.board[row - direction][col]
+            if isinstance(pawn, Pawn) and pawn.colour == ('B' if turn == 'w' else 'W'):
+                self.en_passant_pos = (col, row)
+
+        self.turn = turn.upper()
+        self.halfmove_clock = int(fields[4]) if len(fields) == 6 else 0
+        self.fullmove_number = int(fields[5]) if len(fields) == 6 else 1
+        if self.turn == 'B':
+            self.hash ^= TURN_KEY
+        self.hash ^= castling_key(self.get_castling_rights()) ^ en_passant_key(self.get_en_passant_col())
+
+    def get_fen(self):
+        '''return position as FEN string'''
+        ranks = []
+        for row in self.board:
+            rank, empty = '', 0
+            for piece in row:
+                if piece == 0:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                letter = FEN_LETTERS[type(piece)]
+                rank += letter if piece.colour == 'W' else letter.lower()
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+
+        en_passant = convert_to_notation(self.en_passant_pos) if self.en_passant_pos is not None else '-'
+        return ' '.join(['/'.join(ranks), self.turn.lower(), self.castling or '-',
+                         en_passant, str(self.halfmove_clock), str(self.fullmove_number)])
+
+    def get_position(self):
+        '''
+        return position as POSITION_SIZE bytes - piece code of every square (row * COLS + col),
+        then turn, castling bits, en passant square, halfmove clock (max 255) and fullmove number.
+        a few dozen bytes instead of a pickled board of piece objects, e.g. to send to another process.
+        it is a snapshot - the board keeps its pieces, set_position creates them again
+        '''
+        position = bytearray(POSITION_SIZE)
+        for colour in self.pieces:
+            for piece in self.pieces[colour]:
+                code = PIECE_CODES[type(piece)]
+                if colour == 'B':
+                    code |= BLACK_CODE
+                if piece.move_num > 0:
+                    code |= MOVED_CODE
+                position[piece.row * COLS + piece.col] = code
+
+        i = ROWS * COLS
+        position[i] = self.turn == 'B'
+        position[i + 1] = sum(CASTLING_BITS[right] for right in self.castling)
+        if self.en_passant_pos is not None:
+            col, row = self.en_passant_pos
+            position[i + 2] = row * COLS + col
+        else:
+            position[i + 2] = NO_SQUARE
+        position[i + 3] = min(self.halfmove_clock, 255)
+        position[i + 4:i + 6] = min(self.fullmove_number, 0xFFFF).to_bytes(2, 'little')
+        return bytes(position)
+
+    def set_position(self, position):
+        '''replace position with bytes from get_position, raises ValueError if they are not a position'''
+        if len(position) != POSITION_SIZE:
+            raise ValueError('invalid position')
+        self.clear()
+        for sq in range(ROWS * COLS):
+            code = position[sq]
+            if code == 0:
+                continue
+            piece_class = CODE_PIECES.get(code & 7)
+            if piece_class is None:
+                raise ValueError('invalid position')
+            piece = piece_class(sq % COLS, sq // COLS, 'B' if code & BLACK_CODE else 'W')
+            piece.move_num = 1 if code & MOVED_CODE else 0
+            self.add_piece(piece)
+        if not self.has_one_king_each():
+            raise ValueError('invalid position (one king of each colour needed)')
+
+        i = ROWS * COLS
+        self.turn = 'B' if position[i] else 'W'
+        self.castling = ''.join(right for right, bit in CASTLING_BITS.items() if position[i + 1] & bit)
+        sq = position[i + 2]
+        if sq == NO_SQUARE:
+            self.en_passant_pos = None
+        elif sq < ROWS * COLS and sq // COLS == (2 if self.turn == 'W' else ROWS - 3):  # square passed by side that just moved
+            self.en_passant_pos = (sq % COLS, sq // COLS)
+        else:
+            raise ValueError('invalid position (en passant square)')
+        self.halfmove_clock = position[i + 3]
+        self.fullmove_number = int.from_bytes(position[i + 4:i + 6], 'little')
+        if self.turn == 'B':
+            self.hash ^= TURN_KEY
+        self.hash ^= castling_key(self.get_castling_rights()) ^ en_passant_key(self.get_en_passant_col())
+
+
     def castle(self, side, colour, new_k_pos):
-        '''move king and rook to correct squares when castling'''
+        '''move king and rook to correct squares when castling, returns rook'''
         king = self.get_king(colour)
         new_k_col, new_k_row = new_k_pos
 
@@ -72,21 +457,127 @@ class Board:
         rook = self.get_piece((r_col, king.row))
         new_r_pos = (new_r_col, king.row)
 
-        print(f'{king.colour}K CASTLE {side} SIDE')
         self.move(king, new_k_pos)
         self.move(rook, new_r_pos)
+        return rook
 
 
     def en_passant(self, pawn, new_pos):
-        '''move pawn and remove pawn when capture en passant'''
-        print('EN PASSANT')
+        '''move pawn and remove pawn when capture en passant, returns captured pawn'''
         old_col, old_row = pawn.get_pos()
         new_col, new_row = new_pos
         capture_col, capture_row = new_col, old_row
+        captured = self.get_piece((capture_col, capture_row))
         self.move(pawn, new_pos)
-        self.board[capture_row][capture_col] = 0
+        self.remove_piece(captured)
+        return captured
 
 
+    def promote(self, pos, choice):
+        '''replace pawn on pos with piece of choice (Q, R, B, N), returns new piece'''
+        col, row = pos
+        pawn = self.get_piece(pos)
+        new_piece = PROMOTION_PIECES[choice](col, row, pawn.get_colour())
+        new_piece.move_num = pawn.move_num
+        self.remove_piece(pawn)
+        self.add_piece(new_piece)
+        return new_piece
+
+
+    def make_move(self, piece, new_pos, promotion=None):
+        '''
+        make move in place (castling, en passant and promotion included)
+
+        returns: Move record that can be passed to unmake_move to restore the board
+        '''
+        old_col, old_row = piece.get_pos()
+        new_col, new_row = new_pos
+        record = Move(piece, (old_col, old_row), new_pos, castling=self.castling, en_passant_pos=self.en_passant_pos,
+                      halfmove_clock=self.halfmove_clock, hash=self.hash)
+        state_key = castling_key(self.castling) ^ en_passant_key(self.get_en_passant_col())
+
+        # castling - king moves 2 squares, rook jumps to other side of king
+        if isinstance(piece, King) and abs(new_col - old_col) > 1:
+            side = 'K' if new_col > old_col else 'Q'
+            r_col = COLS - 1 if side == 'K' else 0
+            record.rook = self.castle(side, piece.get_colour(), new_pos)
+            record.rook_pos = ((r_col, old_row), record.rook.get_pos())
+
+        # en passant - pawn moves diagonally onto empty square
+        elif isinstance(piece, Pawn) and old_col != new_col and self.board[new_row][new_col] == 0:
+            record.captured = self.en_passant(piece, new_pos)
+            record.captured_pos = record.captured.get_pos()
+
+        else:
+            record.captured, record.captured_pos = self.get_piece(new_pos), new_pos
+            self.move(piece, new_pos)
+
+        piece.increment_move_num()
+
+        # pawn promotion
+        if promotion is not None:
+            record.promoted = self.promote(new_pos, promotion)
+
+        # king / rook leaving its square or rook captured on its square loses castling right
+        if self.castling:
+            lost = CASTLING_SQUARES.get(record.old_pos, '') + CASTLING_SQUARES.get(new_pos, '')
+            if lost:
+                self.castling = ''.join(right for right in self.castling if right not in lost)
+
+        if isinstance(piece, Pawn) and abs(new_row - old_row) == 2:
+            self.en_passant_pos = (new_col, (old_row + new_row) // 2)
+        else:
+            self.en_passant_pos = None
+
+        if isinstance(piece, Pawn) or record.captured != 0:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if self.turn == 'B':
+            self.fullmove_number += 1
+
+        # side to move, castling rights and en passant file
+        self.turn = get_opposite_colour(self.turn)
+        state_key ^= castling_key(self.castling) ^ en_passant_key(self.get_en_passant_col())
+        self.hash ^= TURN_KEY ^ state_key
+        return record
+
+
+    def unmake_move(self, record):
+        '''restore board to the position before the move in record was made'''
+        piece = record.piece
+
+        if record.promoted is not None:
+            self.remove_piece(record.promoted)
+            self.add_piece(piece)
+
+        if record.rook is not None:
+            self.move(record.rook, record.rook_pos[0])
+
+        self.move(piece, record.old_pos)
+        piece.move_num = record.move_num
+
+        if record.captured != 0:
+            self.add_piece(record.captured)
+
+        self.castling = record.castling
+        self.en_passant_pos = record.en_passant_pos
+        self.turn = get_opposite_colour(self.turn)
+        self.halfmove_clock = record.halfmove_clock
+        if self.turn == 'B':
+            self.fullmove_number -= 1
+        self.hash = record.hash
+
+
+    def remake_move(self, record):
+        '''make move in record again after it was unmade (promoted piece is reused), returns new Move record'''
+        new_record = self.make_move(record.piece, record.new_pos)
+        if record.promoted is not None:
+            self.remove_piece(record.piece)
+            self.add_piece(record.promoted)
+            new_record.promoted = record.promoted
+        return new_record
+
 
 
 
@@ -98,9 +589,6 @@ class Board:
 
 
 
-    def highlight_square(self, piece, win):
-        '''when piece selected on board - square of piece higligheted in green'''
-        win.blit(G_BOX, piece.get_coordinate())
 
     def print_row(self, lst):
         row = '|'
@@ -111,20 +599,25 @@ class Board:
         return row
 
 
-    def print_board(self):
-        '''print board on terminal'''
+    def get_board_text(self):
+        '''board as text for the terminal'''
         l = 43
-        print('*' * l)
+        lines = ['*' * l]
 
         for i, row in enumerate(self.board):
             row = str(8-i) + ' ' + self.print_row(row)
-            print(row)
-            print('-' * l)
+            lines.append(row)
+            lines.append('-' * l)
 
         footer = self.print_row(['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h'])
         foot = '  ' + footer
-        print(foot)
-        print('*' * l)
+        lines.append(foot)
+        lines.append('*' * l)
+        return '\n'.join(lines)
+
+    def print_board(self):
+        '''print board on terminal'''
+        print(self.get_board_text())
 
 
     def create_board(self):
@@ -135,88 +628,38 @@ class Board:
             b_p = Pawn(col, 1, 'B')
             w_p = Pawn(col, 6, 'W')
 
-            self.board[1][col] = b_p
-            self.board[6][col] = w_p
+            self.add_piece(b_p)
+            self.add_piece(w_p)
 
         # kings - col 4 / e file
         b_k = King(4, 0, 'B')
         w_k = King(4, 7, 'W')
-        self.board[0][4] = b_k
-        self.board[7][4] = w_k
+        self.add_piece(b_k)
+        self.add_piece(w_k)
 
         # queens - col 3 / d file
         b_q = Queen(3, 0, 'B')
         w_q = Queen(3, 7, 'W')
-        self.board[0][3] = b_q
-        self.board[7][3] = w_q
+        self.add_piece(b_q)
+        self.add_piece(w_q)
 
         # rooks - col 0, 7 / a, h file
         for col in [0, 7]:
             b_r = Rook(col, 0, 'B')
             w_r = Rook(col, 7, 'W')
-            self.board[0][col] = b_r
-            self.board[7][col] = w_r
+            self.add_piece(b_r)
+            self.add_piece(w_r)
 
         # knights - col 1, 6 / b, g file
         for col in [1, 6]:
             b_n = Knight(col, 0, 'B')
             w_n = Knight(col, 7, 'W')
-            self.board[0][col] = b_n
-            self.board[7][col] = w_n
+            self.add_piece(b_n)
+            self.add_piece(w_n)
 
         # bishop - col 2, 5 / c, f file
         for col in [2, 5]:
             b_b = Bishop(col, 0, 'B')
             w_b = Bishop(col, 7, 'W')
-            self.board[0][col] = b_b
-            self.board[7][col] = w_b
-
-    def draw_check(self, colour, win):
-        '''draw red circle behind king when in check'''
-        king = self.get_king(colour)
-        king.draw_check(win)
-
-
-    def draw_squares(self, win):
-        '''draw checkerboard pattern'''
-        win.fill(LIGHT_BROWN)
-        for row in range(ROWS):
-            for col in range((row+1) % 2, COLS, 2):
-                pygame.draw.rect(win, DARK_BROWN, (row*SQUARE_SIZE, col*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-
-    
-    def draw_rank(self, win):
-        '''draw rank/row number at left side of board'''
-        x, y = 2, 2
-        for i in range(8, 0, -1):
-            colour = LIGHT_BROWN if i % 2 != 0 else DARK_BROWN
-            text = FONT.render(str(i), True, colour)
-            win.blit(text, (x, y))
-            y += SQUARE_SIZE
-
-    def draw_file(self, win):
-        '''draw file/col number at bottom of board'''
-        file = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
-        x, y = SQUARE_SIZE - FONT_SIZE + 8 , HEIGHT - FONT_SIZE + 5
-        for i, ele in enumerate(file):
-            colour = LIGHT_BROWN if i % 2 == 0 else DARK_BROWN
-            text = FONT.render(ele, True, colour)
-            win.blit(text, (x, y))
-            x += SQUARE_SIZE
-            
-
-
-    def draw_board(self, win):
-        '''draw board and draw pieces onto board'''
-        self.draw_squares(win)
-        self.draw_rank(win)
-        self.draw_file(win)
-
-    def draw_pieces(self, win):
-        '''draw pieces on board'''
-        for row in self.board:
-            for piece in row:
-                if piece == 0:
-                    continue
-                else:
-                    piece.show(win)
+            self.add_piece(b_b)
+            self.add_piece(w_b)
@@ -0,0 +1,380 @@
+'''
+computer opponent - negamax alpha-beta search with iterative deepening and a hard time budget per move
+
+$ python engine.py --time 2          # search start position and print search info
+'''
+import argparse
+import time
+import instrument
+from constant import *
+from instrument import log
+from piece import *
+from transposition import TranspositionTable, EXACT, LOWER, UPPER, encode_move, decode_move
+
+MATE = 100000
+INF = 10 * MATE
+MAX_PLY = 64
+
+PIECE_VALUES = {Pawn: 100, Knight: 320, Bishop: 330, Rook: 500, Queen: 900, King: 0}
+
+# piece-square tables from white side, row 0 = rank 8 (same layout as Board.board)
+PAWN_TABLE = [
+    [  0,   0,   0,   0,   0,   0,   0,   0],
+    [ 50,  50,  50,  50,  50,  50,  50,  50],
+    [ 10,  10,  20,  30,  30,  20,  10,  10],
+    [  5,   5,  10,  25,  25,  10,   5,   5],
+    [  0,   0,   0,  20,  20,   0,   0,   0],
+    [  5,  -5, -10,   0,   0, -10,  -5,   5],
+    [  5,  10,  10, -20, -20,  10,  10,   5],
+    [  0,   0,   0,   0,   0,   0,   0,   0],
+]
+KNIGHT_TABLE = [
+    [-50, -40, -30, -30, -30, -30, -40, -50],
+    [-40, -20,   0,   0,   0,   0, -20, -40],
+    [-30,   0,  10,  15,  15,  10,   0, -30],
+    [-30,   5,  15,  20,  20,  15,   5, -30],
+    [-30,   0,  15,  20,  20,  15,   0, -30],
+    [-30,   5,  10,  15,  15,  10,   5, -30],
+    [-40, -20,   0,   5,   5,   0, -20, -40],
+    [-50, -40, -30, -30, -30, -30, -40, -50],
+]
+BISHOP_TABLE = [
+    [-20, -10, -10, -10, -10, -10, -10, -20],
+    [-10,   0,   0,   0,   0,   0,   0, -10],
+    [-10,   0,   5,  10,  10,   5,   0, -10],
+    [-10,   5,   5,  10,  10,   5,   5, -10],
+    [-10,   0,  10,  10,  10,  10,   0, -10],
+    [-10,  10,  10,  10,  10,  10,  10, -10],
+    [-10,   5,   0,   0,   0,   0,   5, -10],
+    [-20, -10, -10, -10, -10, -10, -10, -20],
+]
+ROOK_TABLE = [
+    [  0,   0,   0,   0,   0,   0,   0,   0],
+    [  5,  10,  10,  10,  10,  10,  10,   5],
+    [ -5,   0,   0,   0,   0,   0,   0,  -5],
+    [ -5,   0,   0,   0,   0,   0,   0,  -5],
+    [ -5,   0,   0,   0,   0,   0,   0,  -5],
+    [ -5,   0,   0,   0,   0,   0,   0,  -5],
+    [ -5,   0,   0,   0,   0,   0,   0,  -5],
+    [  0,   0,   0,   5,   5,   0,   0,   0],
+]
+QUEEN_TABLE = [
+    [-20, -10, -10,  -5,  -5, -10, -10, -20],
+    [-10,   0,   0,   0,   0,   0,   0, -10],
+    [-10,   0,   5,   5,   5,   5,   0, -10],
+    [ -5,   0,   5,   5,   5,   5,   0,  -5],
+    [  0,   0,   5,   5,   5,   5,   0,  -5],
+    [-10,   5,   5,   5,   5,   5,   0, -10],
+    [-10,   0,   5,   0,   0,   0,   0, -10],
+    [-20, -10, -10,  -5,  -5, -10, -10, -20],
+]
+KING_TABLE = [
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-20, -30, -30, -40, -40, -30, -30, -20],
+    [-10, -20, -20, -20, -20, -20, -20, -10],
+    [ 20,  20,   0,   0,   0,   0,  20,  20],
+    [ 20,  30,  10,   0,   0,  10,  30,  20],
+]
+PIECE_TABLES = {Pawn: PAWN_TABLE, Knight: KNIGHT_TABLE, Bishop: BISHOP_TABLE,
+                Rook: ROOK_TABLE, Queen: QUEEN_TABLE, King: KING_TABLE}
+
+
+class SearchTimeout(Exception):
+    '''raised inside the search when the time budget of the move is used up'''
+
+
+def score_to_table(score, ply):
+    '''mate scores are stored as distance from position, not from root'''
+    if score >= MATE - MAX_PLY:
+        return score + ply
+    if score <= -MATE + MAX_PLY:
+        return score - ply
+    return score
+
+def score_from_table(score, ply):
+    if score >= MATE - MAX_PLY:
+        return score - ply
+    if score <= -MATE + MAX_PLY:
+        return score + ply
+    return score
+
+
+def move_name(move):
+    piece, pos, promotion = move
+    return convert_to_notation(piece.get_pos()) + convert_to_notation(pos) + (promotion or '').lower()
+
+
+class Engine:
+    '''
+    picks a move for the side to move of a Game
+
+    - negamax alpha-beta with iterative deepening - result of last completed depth is played
+    - move ordering: best move of previous depth, MVV-LVA captures, killer moves, history heuristic
+    - quiescence search of captures at the leaves
+    - transposition table of hash_mb megabytes (0 = none), kept between searches
+    - time_limit is a hard budget in seconds, checked every few hundred nodes - None searches to max_depth
+    '''
+    def __init__(self, time_limit=1.0, max_depth=MAX_PLY, hash_mb=16):
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.table = TranspositionTable(hash_mb) if hash_mb > 0 else None
+        self.nodes = 0
+        self.depth = 0
+        self.score = 0
+        self.elapsed = 0
+
+    def get_info(self):
+        '''depth reached, score and speed of last search'''
+        nps = self.nodes / max(self.elapsed, 1e-9)
+        info = f'depth {self.depth} score {self.score} nodes {self.nodes} time {self.elapsed:.2f}s nps {nps:.0f}'
+        if self.table is not None and self.table.probes > 0:
+            info += f' hash hits {self.table.hits}/{self.table.probes}'
+        return info
+
+
+    def prepare(self, game, path=None):
+        '''
+        reset search state for new search of game
+
+        path: hashes of positions already played (counted for repetition) - default from game.history
+        '''
+        self.game = game
+        self.board = game.board
+        self.nodes = 0
+        self.depth = 0
+        self.score = 0
+        self.start = time.perf_counter()
+        self.deadline = self.start + self.time_limit if self.time_limit is not None else float('inf')
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = {}  # (from, to) -> bonus of quiet moves that caused a cutoff
+        if self.table is not None:
+            self.table.new_search()
+            self.table.reset_stats()
+
+        if path is None:
+            path = [record.hash for record in game.history]
+        self.path = {}
+        for key in path:
+            self.path[key] = self.path.get(key, 0) + 1
+
+
+    def search(self, game, colour=None, path=None):
+        '''
+        return best (piece, pos, promotion) for colour (default side to move), None if no legal move
+
+        path: see prepare
+        '''
+        colour = colour or game.turn
+        self.prepare(game, path)
+
+        moves = game.get_move_list(colour)
+        if not moves:
+            return None
+
+        best_move = moves[0]
+        for depth in range(1, self.max_depth + 1):
+            try:
+                score, move = self.search_root(moves, colour, depth, best_move)
+            except SearchTimeout:
+                break
+            best_move, self.score, self.depth = move, score, depth
+            self.elapsed = time.perf_counter() - self.start
+            log.info(f'{self.get_info()} best {move_name(best_move)}')
+            if abs(score) >= MATE - MAX_PLY:  # forced mate found
+                break
+
+        self.elapsed = time.perf_counter() - self.start
+        return best_move
+
+
+    def search_root(self, moves, colour, depth, best_move):
+        moves.sort(key=lambda move: move is not best_move)  # stable - rest keeps previous order
+        opp_colour = get_opposite_colour(colour)
+        alpha, best = -INF, None
+        self.enter(self.board.get_hash())
+        try:
+            for move in moves:
+                score = -self.make_and_search(move, opp_colour, depth - 1, -INF, -alpha, 1)
+                if score > alpha:
+                    alpha, best = score, move
+        finally:
+            self.leave(self.board.get_hash())
+        return alpha, best
+
+
+    def make_and_search(self, move, colour, depth, alpha, beta, ply):
+        piece, pos, promotion = move
+        record = self.board.make_move(piece, pos, promotion)
+        try:
+            return self.negamax(colour, depth, alpha, beta, ply)
+        finally:
+            self.board.unmake_move(record)
+
+
+    def negamax(self, colour, depth, alpha, beta, ply):
+        self.count_node()
+        key = self.board.get_hash()
+        if key in self.path:  # repetition - draw
+            return 0
+
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiesce(colour, alpha, beta, ply)
+
+        hash_move = None
+        if self.table is not None:
+            entry = self.table.probe(key)
+            if entry is not None:
+                entry_depth, score, bound, move = entry
+                hash_move = decode_move(move)
+                score = score_from_table(score, ply)
+                if entry_depth >= depth:
+                    if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                        return score
+
+        moves = self.game.get_move_list(colour)
+        if not moves:
+            return -MATE + ply if self.board.is_check(colour) else 0
+
+        opp_colour = get_opposite_colour(colour)
+        moves.sort(key=lambda move: self.order_score(move, ply, hash_move), reverse=True)
+        best, best_move, alpha_start = -INF, None, alpha
+        self.enter(key)
+        try:
+            for move in moves:
+                score = -self.make_and_search(move, opp_colour, depth - 1, -beta, -alpha, ply + 1)
+                if score > best:
+                    best, best_move = score, move
+                    if score > alpha:
+                        alpha = score
+                if alpha >= beta:
+                    if not self.is_capture(move):
+                        self.store_killer(move, ply)
+                        from_to = (move[0].get_pos(), move[1])
+                        self.history[from_to] = self.history.get(from_to, 0) + depth * depth
+                    break
+        finally:
+            self.leave(key)
+
+        if self.table is not None:
+            bound = UPPER if best <= alpha_start else LOWER if best >= beta else EXACT
+            piece, pos, promotion = best_move
+            self.table.store(key, depth, score_to_table(best, ply), bound, encode_move(piece.get_pos(), pos, promotion))
+        return best
+
+
+    def quiesce(self, colour, alpha, beta, ply):
+        '''search captures only until position is quiet'''
+        self.count_node()
+        stand_pat = self.evaluate(colour)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        captures = [move for move in self.game.get_move_list(colour) if self.is_capture(move)]
+        captures.sort(key=self.mvv_lva, reverse=True)
+        opp_colour = get_opposite_colour(colour)
+        for move in captures:
+            score = -self.make_and_search_quiet(move, opp_colour, -beta, -alpha, ply + 1)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def make_and_search_quiet(self, move, colour, alpha, beta, ply):
+        piece, pos, promotion = move
+        record = self.board.make_move(piece, pos, promotion)
+        try:
+            return self.quiesce(colour, alpha, beta, ply)
+        finally:
+            self.board.unmake_move(record)
+
+
+    def count_node(self):
+        self.nodes += 1
+        if self.nodes & 255 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+    def enter(self, key):
+        self.path[key] = self.path.get(key, 0) + 1
+
+    def leave(self, key):
+        self.path[key] -= 1
+        if self.path[key] == 0:
+            del self.path[key]
+
+
+    def is_capture(self, move):
+        piece, pos, promotion = move
+        if self.board.get_piece(pos) != 0:
+            return True
+        return isinstance(piece, Pawn) and piece.col != pos[0]  # en passant
+
+    def mvv_lva(self, move):
+        '''most valuable victim, least valuable attacker'''
+        piece, pos, promotion = move
+        victim = self.board.get_piece(pos)
+        victim_value = PIECE_VALUES[type(victim)] if victim != 0 else PIECE_VALUES[Pawn]
+        return 10 * victim_value - PIECE_VALUES[type(piece)]
+
+    def order_score(self, move, ply, hash_move=None):
+        piece, pos, promotion = move
+        key = (piece.get_pos(), pos, promotion)
+        if key == hash_move:  # best move found by earlier search of position
+            return 2000000
+        if self.is_capture(move):
+            return 1000000 + self.mvv_lva(move)
+        if promotion is not None:
+            return 900000 + PIECE_VALUES[PROMOTION_PIECES[promotion]]
+        killers = self.killers[ply]
+        if key == killers[0]:
+            return 800000
+        if key == killers[1]:
+            return 700000
+        return self.history.get((piece.get_pos(), pos), 0)
+
+    def store_killer(self, move, ply):
+        piece, pos, promotion = move
+        key = (piece.get_pos(), pos, promotion)
+        killers = self.killers[ply]
+        if key != killers[0]:
+            killers[1], killers[0] = killers[0], key
+
+
+    def evaluate(self, colour):
+        '''material + piece-square tables, from view of colour'''
+        score = 0
+        for piece_colour, sign in (('W', 1), ('B', -1)):
+            for piece in self.board.get_pieces(piece_colour):
+                row = piece.row if piece_colour == 'W' else ROWS - 1 - piece.row
+                piece_class = type(piece)
+                score += sign * (PIECE_VALUES[piece_class] + PIECE_TABLES[piece_class][row][piece.col])
+        return score if colour == 'W' else -score
+
+
+def main():
+    from game import Game
+    parser = argparse.ArgumentParser(description='search start position and print search info')
+    parser.add_argument('--time', type=float, default=2.0, help='seconds per move')
+    parser.add_argument('--moves', type=int, default=1, help='number of moves to play')
+    parser.add_argument('--hash', type=int, default=16, help='transposition table size in MB, 0 for none')
+    instrument.add_arguments(parser, log_level='info')
+    args = parser.parse_args()
+
+    with instrument.session(args):
+        game = Game()
+        engine = Engine(args.time, hash_mb=args.hash)
+        for _ in range(args.moves):
+            if game.checkmate or game.stalemate:
+                break
+            move = engine.search(game)
+            print(f'{game.turn} plays {move_name(move)} ({engine.get_info()})')
+            game.play_move(*move)
+
+
+if __name__ == '__main__':
+    main()
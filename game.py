@@ -1,27 +1,37 @@
-import pygame
-import sys
-from board import Board
+from collections import OrderedDict
+from logging import DEBUG
+from board import Board, FEN_LETTERS, START_FEN
 from constant import *
+from instrument import log
 from piece import *
-from copy import deepcopy
-import time
+
+LEGAL_MOVE_CACHE_SIZE = 64  # positions kept by get_position_legal_moves, least recently used dropped first
 
 class Game:
-    def __init__(self, win):
-        self.win = win
-        self._init()
+    '''rules and state of a game - no window needed, see GameWindow in gui.py for drawing'''
+    def __init__(self, board_class=Board, board=None):
+        '''board: continue from existing board (e.g. unpickled in a worker process) instead of start position'''
+        self.board_class = type(board) if board is not None else board_class  # Board or BitBoard backend
+        self._init(board)
 
-    def _init(self):
+    def _init(self, board=None):
         self.selected = None
-        self.board = Board()
-        self.turn = 'W'
+        self.board = board if board is not None else self.board_class()
+        self.turn = self.board.turn
         self.legal_moves = None
-        self.check = False
-        self.history = []
-        self.future = []
+        self.check = self.board.is_check(self.turn)
+        self.history = []  # Move records of moves made, undo unmakes the last one
+        self.future = []   # Move records of undone moves, redo makes them again
         self.checkmate = False
         self.stalemate = False
-        self.board.print_board()
+        self.legal_move_cache = OrderedDict()  # board hash -> {pos of piece: legal moves}, see get_position_legal_moves
+        self.pins_and_checks = None  # see get_pins_and_checks
+        self.pins_and_checks_key = None
+        self.start_fen = self.board.get_fen()  # position before first move, written to PGN
+        if board is None:
+            self.log_board()
+        else:
+            self.update_game_end()  # given position may already be checkmate / stalemate
 
     def reset(self):
         self._init()
@@ -32,102 +42,187 @@ class Game:
     def get_stalemate(self):
         return self.stalemate
 
-    def update(self):
-        self.board.draw_board(self.win)
-
+    def select(self, pos):
+        '''piece already selected - move piece'''
         if self.selected:
-            self.board.highlight_square(self.selected, self.win)
-            self.show_legal_moves(self.legal_moves)
+            if pos in self.legal_moves:
+                self.play_move(self.selected, pos)
 
-        if self.check:
-            self.board.draw_check(self.turn, self.win)
+            self.selected = None
 
-        self.board.draw_pieces(self.win)
-        pygame.display.update()
+        # no piece selected - select piece
+        else:
+            selected_piece = self.board.get_piece(pos)
+            if selected_piece != 0:
+                if selected_piece.get_colour() == self.turn:
+                    self.selected = selected_piece
+                    self.legal_moves = self.get_position_legal_moves()[pos]
+                    log.debug(' '.join(map(convert_to_notation, self.legal_moves)))
 
-        if self.checkmate:
-            self.draw_game_end('checkmate')
 
-        if self.stalemate:
-            self.draw_game_end('stalemate')
 
+    def play_move(self, piece, pos, promotion=None):
+        '''
+        play legal move for side to move and update check / checkmate / stalemate
 
-    def select(self, pos):
-        '''piece already selected - move piece'''
-        if self.selected:
-            if pos in self.legal_moves:
-                col, row = pos
-                self.history.append(deepcopy(self.board))
+        promotion: piece pawn promotes to (Q, R, B, N) - asked with promote_pawn if not given
+        '''
+        col, row = pos
+        san = self.get_san(piece, pos)  # before move - other pieces that could move to pos are needed
+        record = self._move(piece, pos, promotion)
+        if record.promoted is not None:
+            san += '=' + FEN_LETTERS[type(record.promoted)]
+        self.history.append(record)
+        self.future = []
 
-                # castling
-                if isinstance(self.selected, King) and abs(self.selected.col - col) > 1:
-                    side = 'Q' if self.selected.col - col > 1 else 'K'
-                    self.board.castle(side, self.turn, pos)
+        if record.is_castle():
+            side = 'K' if col > record.old_pos[0] else 'Q'
+            log.info(f'{self.turn}K CASTLE {side} SIDE')
 
-                # en passant
-                if isinstance(self.selected, Pawn) and self.board.get_piece(pos) == 0 and self.selected.col != col:
-                    self.board.en_passant(self.selected, pos)
+        if record.is_en_passant():
+            log.info('EN PASSANT')
 
-                # normal move
-                else:
-                    self._move(self.selected, pos)
+        self.turn = get_opposite_colour(self.turn)
 
-                self.turn = get_opposite_colour(self.turn)
+        self.log_board()
 
-                self.board.print_board()
-                self.selected.increment_move_num()
+        self.update_game_end()
+        record.san = san + ('#' if self.checkmate else '+' if self.check else '')
+        return record
 
-                self.check = self.board.is_check(self.turn)
-                all_legal_moves = self.get_all_legal_moves(self.turn)
-                if all_legal_moves == []:
-                    if self.check:
-                        self.checkmate = True
-                    else:
-                        self.stalemate = True
+    def log_board(self):
+        '''board on the console at debug level - text is only built when it is shown'''
+        if log.isEnabledFor(DEBUG):
+            log.debug(self.board.get_board_text())
 
-            self.selected = None
+    def update_game_end(self):
+        '''set check / checkmate / stalemate of side to move'''
+        # fills legal move cache for this position - clicks on pieces then only look it up
+        self.check = self.board.is_check(self.turn)
+        if not any(self.get_position_legal_moves().values()):
+            if self.check:
+                self.checkmate = True
+            else:
+                self.stalemate = True
 
-        # no piece selected - select piece
-        else:
-            selected_piece = self.board.get_piece(pos)
-            if selected_piece != 0:
-                if selected_piece.get_colour() == self.turn:
-                    self.selected = selected_piece
-                    self.legal_moves = self.get_legal_moves(self.selected)
-                    print(list(map(convert_to_notation, self.legal_moves)))
 
+    def load_fen(self, fen):
+        '''set up position of FEN string (see Board.set_fen) - history is cleared'''
+        self._init(self.board_class(fen))
 
+    def get_fen(self):
+        return self.board.get_fen()
 
-    def _move(self, piece, pos):
-        self.board.move(piece, pos)
 
-        # pawn promotion
+    def get_san(self, piece, pos, promotion=None):
+        '''
+        return move of piece to pos in SAN without check suffix (position before move)
+
+        other pieces are only asked for legal moves when they are of the same type
+        '''
+        old_col, old_row = piece.get_pos()
         col, row = pos
+        if isinstance(piece, King) and abs(col - old_col) > 1:
+            return 'O-O' if col > old_col else 'O-O-O'
+
+        square = convert_to_notation(pos)
+        capture = self.board.get_piece(pos) != 0
         if isinstance(piece, Pawn):
+            if old_col != col:  # capture or en passant
+                square = convert_to_notation(piece.get_pos())[0] + 'x' + square
+            return square + ('=' + promotion if promotion is not None else '')
+
+        # disambiguation - file if it tells pieces apart, else rank, else both
+        others = [other for other in list(self.board.get_pieces(piece.get_colour()))
+                  if other is not piece and type(other) is type(piece) and pos in self.iter_legal_moves(other)]
+        origin = ''
+        if others:
+            if all(other.col != old_col for other in others):
+                origin = convert_to_notation(piece.get_pos())[0]
+            elif all(other.row != old_row for other in others):
+                origin = convert_to_notation(piece.get_pos())[1]
+            else:
+                origin = convert_to_notation(piece.get_pos())
+        return FEN_LETTERS[type(piece)] + origin + ('x' if capture else '') + square
+
+    def get_san_moves(self):
+        '''SAN of moves played so far'''
+        return [record.san for record in self.history]
+
+    def get_result(self):
+        '''1-0, 0-1, 1/2-1/2 or * (game not finished)'''
+        if self.checkmate:
+            return '0-1' if self.turn == 'W' else '1-0'
+        if self.stalemate:
+            return '1/2-1/2'
+        return '*'
+
+    def get_pgn(self, tags=None):
+        '''
+        return game as PGN text
+
+        tags: tag name -> value added to / replacing the defaults (Event, White, Black ...)
+        '''
+        all_tags = {'Event': '?', 'Site': '?', 'Date': '????.??.??', 'Round': '?',
+                    'White': '?', 'Black': '?', 'Result': self.get_result()}
+        if self.start_fen != START_FEN:
+            all_tags.update({'SetUp': '1', 'FEN': self.start_fen})
+        all_tags.update(tags or {})
+        lines = [f'[{name} "{value}"]' for name, value in all_tags.items()]
+
+        # movetext wrapped at 80 chars
+        fields = self.start_fen.split()
+        colour, number = fields[1].upper(), int(fields[5])
+        tokens = []
+        for i, san in enumerate(self.get_san_moves()):
+            if colour == 'W':
+                tokens.append(f'{number}.')
+            elif i == 0:
+                tokens.append(f'{number}...')
+            tokens.append(san)
+            if colour == 'B':
+                number += 1
+            colour = get_opposite_colour(colour)
+        tokens.append(all_tags['Result'])
+
+        movetext, line = [], ''
+        for token in tokens:
+            if line and len(line) + 1 + len(token) > 80:
+                movetext.append(line)
+                line = token
+            else:
+                line = f'{line} {token}' if line else token
+        movetext.append(line)
+        return '\n'.join(lines) + '\n\n' + '\n'.join(movetext) + '\n'
+
+
+    def _move(self, piece, pos, promotion=None):
+        '''make move on board (castling / en passant included), returns Move record'''
+        # pawn promotion
+        col, row = pos
+        if isinstance(piece, Pawn) and promotion is None:
             if piece.get_colour() == 'W':
                 promote_row = 0
             else:
                 promote_row = ROWS - 1
 
             if row == promote_row:
-                self.promote_pawn(pos, piece.get_colour())
+                record = self.board.make_move(piece, pos)
+                record.promoted = self.promote_pawn(pos, piece.get_colour())
+                return record
+
+        return self.board.make_move(piece, pos, promotion)
 
 
     def promote_pawn(self, pos, colour):
+        '''ask which piece pawn promotes to, returns new piece'''
         print('PAWN PROMOTION')
-        col, row = pos
         print('[Q] QUEEN, [R] ROOK, [B] BISHOP, [N] KNIGHT')
-        choice = input('Pawn Promotion:').upper()
+        choice = ''
+        while choice not in PROMOTION_PIECES:
+            choice = input('Pawn Promotion:').upper()
 
-        if choice == 'Q':
-            new_piece = Queen(col, row, colour)
-        if choice == 'R':
-            new_piece = Rook(col, row, colour)
-        if choice == 'B':
-            new_piece = Bishop(col, row, colour)
-        if choice == 'N':
-            new_piece = Knight(col, row, colour)
-        self.board.board[row][col] = new_piece
+        return self.board.promote(pos, choice)
 
 
 
@@ -141,207 +236,180 @@ class Game:
 
         returns: list of position of legal moves
         '''
-        legal_moves = []
+        return list(self.iter_legal_moves(piece))
 
-        # en passant
-        if isinstance(piece, Pawn):
-            legal_moves.extend(self.get_en_passant_move(piece))
 
-        # castling
+    def iter_legal_moves(self, piece):
+        '''yield position of legal moves one at a time - special moves are only generated if needed'''
+        pins_and_checks = self.get_pins_and_checks(piece.get_colour())
+
+        # pins, checks and king safety are left to the board (Board.get_safe_moves)
+        yield from self.board.get_safe_moves(piece, pins_and_checks)
+
+        # castling - get_castle_move already checks every square king passes
         if isinstance(piece, King):
-            legal_moves.extend(self.get_castle_move(piece))
+            for pos in self.get_castle_move(piece):
+                yield pos
+            return
 
+        # en passant removes 2 pieces from a row - make move in place and test for check (none in double check)
+        if isinstance(piece, Pawn) and pins_and_checks[1] < 2:
+            for pos in self.get_en_passant_move(piece):
+                if self.is_legal(piece, pos):
+                    yield pos
 
-        # pin pieces / king in check
-        all_moves = piece.get_moves(self.board.get_board()) + legal_moves
-        for pos in all_moves:
-            new_board, new_piece = deepcopy(self.board), deepcopy(piece)
-            new_board.move(new_piece, pos)
-            check = new_board.is_check(self.turn)
-            if not check:
-                legal_moves.append(pos)
 
-        return legal_moves
+    def get_pins_and_checks(self, colour):
+        '''Board.get_pins_and_checks computed once per position and colour'''
+        key = (self.board.get_hash(), colour)
+        if key != self.pins_and_checks_key:
+            self.pins_and_checks = self.board.get_pins_and_checks(colour)
+            self.pins_and_checks_key = key
+        return self.pins_and_checks
+
+
+    def is_legal(self, piece, pos):
+        '''see if move leaves own king out of check'''
+        record = self.board.make_move(piece, pos)
+        check = self.board.is_check(piece.get_colour())
+        self.board.unmake_move(record)
+        return not check
 
 
     def get_castle_move(self, piece):
         castle_move = []
-        all_moves_on_board = self.board.get_all_moves(get_opposite_colour(piece.get_colour()))
+        opp_colour = get_opposite_colour(piece.get_colour())
+        rights = self.board.get_castling_rights()
+        king_side, queen_side = ('K', 'Q') if piece.get_colour() == 'W' else ('k', 'q')
 
-        if piece.get_move_num() == 0:  # king must not have move
+        # king must have castling right left and cannot castle out of check
+        if (king_side in rights or queen_side in rights) and not self.board.is_square_attacked(piece.get_pos(), opp_colour):
             # king side castling
             r_col, r_row = COLS - 1, piece.row
             rook = self.board.get_piece((r_col, r_row))
 
-            if isinstance(rook, Rook):
-                if rook.get_move_num() == 0:  # rook must not have move
+            if king_side in rights and isinstance(rook, Rook):
+                # no piece b/w king and rook && other pieces cannot attack square king passes
+                castle_pos = (r_col - 1, r_row)
+                empty = True
+                for i in range(piece.col + 1, r_col):
+                    if self.board.get_piece((i, r_row)) != 0 or self.board.is_square_attacked((i, r_row), opp_colour):
+                        empty = False
+                        break
 
-                    # no piece b/w king and rook && other pieces cannot move to square b/w king and rook
-                    empty = True
-                    for i in range(piece.col + 1, r_col):
-                        if self.board.get_piece((i, r_row)) != 0 or (i, r_row) in all_moves_on_board:
-                            empty = False
-                            break
-
-                    if empty:
-                        castle_pos = (r_col - 1, r_row)
-                        castle_move.append(castle_pos)
+                if empty:
+                    castle_move.append(castle_pos)
 
             # queen side castling
             r_col, r_row = 0, piece.row
             rook = self.board.get_piece((r_col, r_row))
 
-            if isinstance(rook, Rook):
-                if rook.get_move_num() == 0:  # rook must not have move
-
-                    # no piece b/w king and rook && other pieces cannot move to square b/w king and rook
-                    empty = True
-                    for i in range(r_col + 1, piece.col):
-                        if self.board.get_piece((i, r_row)) != 0 or (i, r_row) in all_moves_on_board:
-                            empty = False
-                            break
-                    if empty:
-                        castle_pos = (r_col + 2, r_row)
-                        castle_move.append(castle_pos)
+            if queen_side in rights and isinstance(rook, Rook):
+                # no piece b/w king and rook && other pieces cannot attack square king passes
+                castle_pos = (r_col + 2, r_row)
+                empty = True
+                for i in range(r_col + 1, piece.col):
+                    if self.board.get_piece((i, r_row)) != 0:
+                        empty = False
+                        break
+                    if i >= castle_pos[0] and self.board.is_square_attacked((i, r_row), opp_colour):
+                        empty = False
+                        break
+                if empty:
+                    castle_move.append(castle_pos)
 
         return castle_move
-        
 
-    def get_en_passant_move(self, piece):
-        delta_row = 3
-        can_en_passant = False
-        en_passant_move = []
 
-        if piece.get_colour() == 'W':
-            if piece.row == delta_row:
-                can_en_passant = True
+    def get_en_passant_move(self, piece):
+        '''square behind pawn that moved 2 squares on the last move, if piece is a pawn next to it'''
+        en_passant_pos = self.board.get_en_passant_pos()
+        if en_passant_pos is None:
+            return []
 
-        else:
-            if piece.row == (ROWS - 1) - delta_row:
-                can_en_passant = True
-
-        if can_en_passant:
-            # check right side
-            if piece.col < COLS - 1:
-                right_pos = (piece.col + 1, piece.row)
-                right_piece = self.board.get_piece(right_pos)
-                if isinstance(right_piece, Pawn):
-                    if right_piece.get_move_num() == 1:
-                        board_before = self.history[-1]
-                        if board_before.get_piece(right_pos) == 0:
-                            en_passant_row = piece.row + 1 if piece.get_colour() == 'B' else piece.row - 1
-                            en_passant_pos = (piece.col + 1, en_passant_row)
-                            en_passant_move.append(en_passant_pos)
-
-            # check left side
-            if piece.col > 0:
-                left_pos = (piece.col - 1, piece.row)
-                left_piece = self.board.get_piece(left_pos)
-                if isinstance(left_piece, Pawn):
-                    if left_piece.get_move_num() == 1:
-                        board_before = self.history[-1]
-                        if board_before.get_piece(left_pos) == 0:
-                            en_passant_row = piece.row + 1 if piece.get_colour() == 'B' else piece.row - 1
-                            en_passant_pos = (piece.col - 1, en_passant_row)
-                            en_passant_move.append(en_passant_pos)
-
-        return en_passant_move
-
-
-        
-    def show_legal_moves(self, legal_moves):
-        '''draw circle on legal moves on window'''
-        size = G_CIRCLE.get_rect().size
-        for pos in self.legal_moves:
-            col, row = pos
-            y = (row * SQUARE_SIZE)
-            x = (col * SQUARE_SIZE)
-            if self.board.get_piece(pos) == 0:
-                self.win.blit(G_CIRCLE, (x, y))
-            else:
-                self.win.blit(CAPTURE_CIRCLE, (x ,y))
+        col, row = en_passant_pos
+        direction = -1 if piece.get_colour() == 'W' else 1
+        if abs(piece.col - col) == 1 and piece.row + direction == row:
+            return [en_passant_pos]
+        return []
 
 
-    
     def undo(self):
         if len(self.history) > 0:
             self.turn = get_opposite_colour(self.turn)
-            self.future.append(deepcopy(self.board))
-            self.board = self.history.pop()
-            print('UNDO')
+            record = self.history.pop()
+            self.board.unmake_move(record)
+            self.future.append(record)
+            self.selected = None
+            self.checkmate = self.stalemate = False
+            self.update_game_end()
+            log.info('UNDO')
 
 
     def redo(self):
         if len(self.future) > 0:
             self.turn = get_opposite_colour(self.turn)
-            self.history.append(deepcopy(self.board))
-            self.board = self.future.pop()
-            print('REDO')
-
-
-    def get_all_legal_moves(self, colour):
-        all_legal_moves = []
-        for row in self.board.get_board():
-            for piece in row:
-                if piece != 0:
-                    if piece.get_colour() == colour:
-                        all_legal_moves.extend(self.get_legal_moves(piece))
-        return all_legal_moves
-
-
-
-
-
-
-
-
-
-
-    def draw_game_end(self, condition):
-        # background
-        x, y = 0, 2 * SQUARE_SIZE
-        bg_rect = pygame.Rect(x, y, COLS * SQUARE_SIZE, 4 * SQUARE_SIZE)
-
-        if condition == 'checkmate':
-            colour = get_opposite_colour(self.turn)
-            colour = 'BLACK' if colour == 'B' else 'WHITE'
-            message = f'CHECKMATE, {colour} WON'
-        else: 
-            message = 'STALEMATE'
-        
-        font = pygame.font.SysFont(None, 50)
-        text = font.render(message, True, RED)
-        text_rect = text.get_rect(center=(WIDTH // 2, y + 50))
+            record = self.future.pop()
+            self.history.append(self.board.remake_move(record))
+            self.history[-1].san = record.san
+            self.selected = None
+            self.update_game_end()
+            log.info('REDO')
 
-        text_play_again = font.render('PLAY AGAIN', True, RED)
-        text_play_again_rect = text_play_again.get_rect(center=(WIDTH // 4, y + 150))
 
-        text_quit = font.render('QUIT', True, RED)
-        text_quit_rect = text_quit.get_rect(center=(int(WIDTH * (3/4)), y + 150))
+    def get_position_legal_moves(self):
+        '''
+        legal moves of every piece of side to move, computed once per position
 
-        
-        
+        cached by zobrist key of board so positions seen again after undo / redo are not recomputed,
+        only the LEGAL_MOVE_CACHE_SIZE most recently used positions are kept
 
-        while True:
-            pygame.draw.rect(self.win, WHITE, bg_rect)
-            self.win.blit(text, text_rect)
-            self.win.blit(text_play_again, text_play_again_rect)
-            self.win.blit(text_quit, text_quit_rect)
+        returns: dict of pos of piece -> list of position of legal moves
+        '''
+        key = self.board.get_hash()
+        legal_moves = self.legal_move_cache.get(key)
+        if legal_moves is not None:
+            self.legal_move_cache.move_to_end(key)
+            return legal_moves
+
+        legal_moves = {}
+        for piece in list(self.board.get_pieces(self.turn)):
+            legal_moves[piece.get_pos()] = self.get_legal_moves(piece)
+        self.legal_move_cache[key] = legal_moves
+        if len(self.legal_move_cache) > LEGAL_MOVE_CACHE_SIZE:
+            self.legal_move_cache.popitem(last=False)
+        return legal_moves
 
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    sys.exit(0)
-                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                    pos = pygame.mouse.get_pos()
 
-                    if text_play_again_rect.collidepoint(pos):
-                        print('PLAY AGAIN')
-                        self._init()
-                        return
+    def get_move_list(self, colour):
+        '''return (piece, pos, promotion) of every legal move of specified colour - one per promotion choice'''
+        moves = []
+        for piece in list(self.board.get_pieces(colour)):
+            if not isinstance(piece, Pawn):
+                moves.extend((piece, pos, None) for pos in self.iter_legal_moves(piece))
+                continue
+            for pos in self.iter_legal_moves(piece):
+                if pos[1] in (0, ROWS - 1):
+                    moves.extend((piece, pos, choice) for choice in PROMOTION_PIECES)
+                else:
+                    moves.append((piece, pos, None))
+        return moves
 
-                    if text_quit_rect.collidepoint(pos):
-                        sys.exit(0)
 
-            pygame.display.update()
+    def get_all_legal_moves(self, colour):
+        all_legal_moves = []
+        for piece in list(self.board.get_pieces(colour)):
+            all_legal_moves.extend(self.get_legal_moves(piece))
+        return all_legal_moves
 
-        
\ No newline at end of file
+    def iter_all_legal_moves(self, colour):
+        '''yield (piece, position) of legal moves of all pieces of specified colour one at a time'''
+        for piece in list(self.board.get_pieces(colour)):
+            for pos in self.iter_legal_moves(piece):
+                yield piece, pos
+
+    def has_any_legal_move(self, colour):
+        '''see if specified colour has at least one legal move - stops at the first one found'''
+        for _ in self.iter_all_legal_moves(colour):
+            return True
+        return False
@@ -0,0 +1,305 @@
+import pygame
+from board import Board
+from constant import *
+from game import Game
+from instrument import log
+from piece import *
+
+pygame.font.init()
+# FONT = pygame.font.SysFont('hackregularnerdfontcomplete', FONT_SIZE)
+FONT = pygame.font.SysFont(None, FONT_SIZE)
+
+# load images
+W_PAWN = pygame.image.load('images/w_pawn.png')
+W_KNIGHT = pygame.image.load('images/w_knight.png')
+W_BISHOP = pygame.image.load('images/w_bishop.png')
+W_ROOK = pygame.image.load('images/w_rook.png')
+W_QUEEN = pygame.image.load('images/w_queen.png')
+W_KING = pygame.image.load('images/w_king.png')
+
+B_PAWN = pygame.image.load('images/b_pawn.png')
+B_KNIGHT = pygame.image.load('images/b_knight.png')
+B_BISHOP = pygame.image.load('images/b_bishop.png')
+B_ROOK = pygame.image.load('images/b_rook.png')
+B_QUEEN = pygame.image.load('images/b_queen.png')
+B_KING = pygame.image.load('images/b_king.png')
+
+g_circle = pygame.image.load('images/g_circle.png')
+G_CIRCLE = pygame.transform.scale(g_circle, (60, 60))
+
+g_box = pygame.image.load('images/g_box.png')
+G_BOX = pygame.transform.scale(g_box, (60, 60))
+
+capture_circle = pygame.image.load('images/capture.png')
+CAPTURE_CIRCLE = pygame.transform.scale(capture_circle, (60, 60))
+
+r_circle = pygame.image.load('images/r_circle.png')
+R_CIRCLE = pygame.transform.scale(r_circle, (60, 60))
+
+PIECE_IMAGES = {
+    'W': {Pawn: W_PAWN, Knight: W_KNIGHT, Bishop: W_BISHOP, Rook: W_ROOK, Queen: W_QUEEN, King: W_KING},
+    'B': {Pawn: B_PAWN, Knight: B_KNIGHT, Bishop: B_BISHOP, Rook: B_ROOK, Queen: B_QUEEN, King: B_KING},
+}
+
+OVERLAY_IMAGES = {'selected': G_BOX, 'move': G_CIRCLE, 'capture': CAPTURE_CIRCLE, 'check': R_CIRCLE}
+
+# light, dark square colour
+THEME = (LIGHT_BROWN, DARK_BROWN)
+
+
+def convert_images():
+    '''convert images to pixel format of display so blits do not convert every frame (display mode must be set)'''
+    if pygame.display.get_surface() is None:
+        return
+    for images in PIECE_IMAGES.values():
+        for piece_class, img in images.items():
+            images[piece_class] = img.convert_alpha()
+    for name, img in OVERLAY_IMAGES.items():
+        OVERLAY_IMAGES[name] = img.convert_alpha()
+
+
+class GameWindow(Game):
+    '''
+    Game drawn on a pygame window
+
+    with dirty_rects only squares that changed since the last update are repainted and flipped
+    '''
+    def __init__(self, win, board_class=Board, dirty_rects=True, theme=THEME):
+        self.win = win
+        self.dirty_rects = dirty_rects
+        self.theme = theme
+        self.background = None  # checkerboard and labels, see get_background
+        self.background_key = None
+        convert_images()
+        super().__init__(board_class)
+
+    def _init(self, board=None):
+        super()._init(board)
+        self.redraw()
+
+    def redraw(self):
+        '''repaint whole window on next update (first frame, new game, window exposed)'''
+        self.full_redraw = True
+        self.dirty = set()  # squares to repaint on next update
+        self.game_end_buttons = None  # name -> rect of buttons on game end screen, None until drawn
+
+    def set_theme(self, light, dark):
+        '''change square colours - background is rebuilt on next update'''
+        self.theme = (light, dark)
+        self.redraw()
+
+    def update(self):
+        if self.full_redraw or not self.dirty_rects:
+            self.draw_board()
+
+            if self.selected:
+                self.highlight_square(self.selected)
+                self.show_legal_moves(self.legal_moves)
+
+            if self.check:
+                self.draw_check(self.turn)
+
+            self.draw_pieces()
+            pygame.display.update()
+            self.full_redraw = False
+            self.dirty.clear()
+
+        elif self.dirty:
+            rects = [self.draw_square(pos) for pos in self.dirty]
+            pygame.display.update(rects)
+            self.dirty.clear()
+
+        # drawn once on top of the board - clicks are handled by click_game_end
+        if (self.checkmate or self.stalemate) and self.game_end_buttons is None:
+            self.draw_game_end('checkmate' if self.checkmate else 'stalemate')
+
+
+    def select(self, pos):
+        before = self.get_overlay_squares()
+        super().select(pos)
+        self.dirty |= before | self.get_overlay_squares()
+
+    def play_move(self, piece, pos, promotion=None):
+        before = self.get_overlay_squares()
+        record = super().play_move(piece, pos, promotion)
+        self.dirty |= before | self.get_overlay_squares() | self.get_move_squares(record)
+        return record
+
+    def undo(self):
+        if len(self.history) > 0:
+            record, before = self.history[-1], self.get_overlay_squares()
+            super().undo()
+            self.dirty |= before | self.get_overlay_squares() | self.get_move_squares(record)
+
+    def redo(self):
+        if len(self.future) > 0:
+            record, before = self.future[-1], self.get_overlay_squares()
+            super().redo()
+            self.dirty |= before | self.get_overlay_squares() | self.get_move_squares(record)
+
+
+    def get_overlay_squares(self):
+        '''squares drawn with selection highlight, legal move circles or check marker'''
+        squares = set()
+        if self.selected:
+            squares.add(self.selected.get_pos())
+            squares.update(self.legal_moves)
+        if self.check:
+            squares.add(self.board.get_king(self.turn).get_pos())
+        return squares
+
+    def get_move_squares(self, record):
+        '''squares changed by move - rook when castling and captured pawn when en passant included'''
+        squares = {record.old_pos, record.new_pos}
+        if record.rook_pos is not None:
+            squares.update(record.rook_pos)
+        if record.captured_pos is not None:
+            squares.add(record.captured_pos)
+        return squares
+
+    def draw_square(self, pos):
+        '''repaint single square with everything drawn on it, returns rect of square'''
+        col, row = pos
+        rect = pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+        self.win.blit(self.get_background(), rect, rect)
+
+        if self.selected:
+            if self.selected.get_pos() == pos:
+                self.highlight_square(self.selected)
+            if pos in self.legal_moves:
+                self.show_legal_moves([pos])
+
+        if self.check and self.board.get_king(self.turn).get_pos() == pos:
+            self.draw_check(self.turn)
+
+        piece = self.board.get_piece(pos)
+        if piece != 0:
+            self.show_piece(piece)
+        return rect
+
+
+    def show_piece(self, piece):
+        '''display image of piece on screen'''
+        self.win.blit(PIECE_IMAGES[piece.get_colour()][type(piece)], piece.get_coordinate())
+
+    def highlight_square(self, piece):
+        '''when piece selected on board - square of piece higligheted in green'''
+        self.win.blit(OVERLAY_IMAGES['selected'], piece.get_coordinate())
+
+    def draw_check(self, colour):
+        '''draw red circle behind king when in check'''
+        king = self.board.get_king(colour)
+        self.win.blit(OVERLAY_IMAGES['check'], king.get_coordinate())
+
+
+    def get_background(self):
+        '''return checkerboard with rank/file labels - drawn once, rebuilt when window size or theme changes'''
+        key = (self.win.get_size(), self.theme)
+        if key != self.background_key:
+            background = pygame.Surface(self.win.get_size())
+            if pygame.display.get_surface() is not None:
+                background = background.convert()
+            self.draw_squares(background)
+            self.draw_rank(background)
+            self.draw_file(background)
+            self.background, self.background_key = background, key
+        return self.background
+
+    def draw_squares(self, surface):
+        '''draw checkerboard pattern'''
+        light, dark = self.theme
+        surface.fill(light)
+        for row in range(ROWS):
+            for col in range((row+1) % 2, COLS, 2):
+                pygame.draw.rect(surface, dark, (row*SQUARE_SIZE, col*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+
+
+    def draw_rank(self, surface):
+        '''draw rank/row number at left side of board'''
+        light, dark = self.theme
+        x, y = 2, 2
+        for i in range(8, 0, -1):
+            colour = light if i % 2 != 0 else dark
+            text = FONT.render(str(i), True, colour)
+            surface.blit(text, (x, y))
+            y += SQUARE_SIZE
+
+    def draw_file(self, surface):
+        '''draw file/col number at bottom of board'''
+        light, dark = self.theme
+        file = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
+        x, y = SQUARE_SIZE - FONT_SIZE + 8 , HEIGHT - FONT_SIZE + 5
+        for i, ele in enumerate(file):
+            colour = light if i % 2 == 0 else dark
+            text = FONT.render(ele, True, colour)
+            surface.blit(text, (x, y))
+            x += SQUARE_SIZE
+
+
+    def draw_board(self):
+        '''draw cached board background'''
+        self.win.blit(self.get_background(), (0, 0))
+
+    def draw_pieces(self):
+        '''draw pieces on board'''
+        for colour in ('W', 'B'):
+            for piece in self.board.get_pieces(colour):
+                self.show_piece(piece)
+
+
+    def show_legal_moves(self, legal_moves):
+        '''draw circle on legal moves on window'''
+        for pos in legal_moves:
+            col, row = pos
+            y = (row * SQUARE_SIZE)
+            x = (col * SQUARE_SIZE)
+            if self.board.get_piece(pos) == 0:
+                self.win.blit(OVERLAY_IMAGES['move'], (x, y))
+            else:
+                self.win.blit(OVERLAY_IMAGES['capture'], (x ,y))
+
+
+    def draw_game_end(self, condition):
+        '''draw game end message with play again / quit buttons'''
+        # background
+        x, y = 0, 2 * SQUARE_SIZE
+        bg_rect = pygame.Rect(x, y, COLS * SQUARE_SIZE, 4 * SQUARE_SIZE)
+
+        if condition == 'checkmate':
+            colour = get_opposite_colour(self.turn)
+            colour = 'BLACK' if colour == 'B' else 'WHITE'
+            message = f'CHECKMATE, {colour} WON'
+        else:
+            message = 'STALEMATE'
+
+        font = pygame.font.SysFont(None, 50)
+        text = font.render(message, True, RED)
+        text_rect = text.get_rect(center=(WIDTH // 2, y + 50))
+
+        text_play_again = font.render('PLAY AGAIN', True, RED)
+        text_play_again_rect = text_play_again.get_rect(center=(WIDTH // 4, y + 150))
+
+        text_quit = font.render('QUIT', True, RED)
+        text_quit_rect = text_quit.get_rect(center=(int(WIDTH * (3/4)), y + 150))
+
+
+        pygame.draw.rect(self.win, WHITE, bg_rect)
+        self.win.blit(text, text_rect)
+        self.win.blit(text_play_again, text_play_again_rect)
+        self.win.blit(text_quit, text_quit_rect)
+        pygame.display.update(bg_rect)
+        self.game_end_buttons = {'play_again': text_play_again_rect, 'quit': text_quit_rect}
+
+    def click_game_end(self, coordinate):
+        '''
+        click on game end screen - play again starts new game
+
+        returns: 'play_again', 'quit' or None when no button was clicked
+        '''
+        for name, rect in (self.game_end_buttons or {}).items():
+            if rect.collidepoint(coordinate):
+                if name == 'play_again':
+                    log.info('PLAY AGAIN')
+                    self._init()
+                return name
+        return None
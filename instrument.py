@@ -0,0 +1,179 @@
+'''
+opt-in instrumentation - log level of console output, timers of hot paths, cProfile capture
+
+nothing is measured until enable() is called: it replaces the methods in HOT_PATHS with timed
+wrappers, disable() puts the originals back, so the rules run at full speed when it is off.
+only modules already imported are instrumented (the window is timed when gui.py is loaded).
+
+    instrument.set_log_level('debug')        # board after every move, legal moves of selection
+    instrument.enable()
+    instrument.start_dump(5)                 # log timers every 5 seconds
+    with instrument.profile('game.prof'):    # cProfile capture, view with snakeviz / flameprof
+        ...
+
+scripts take the same options (--log-level, --stats, --profile) through add_arguments / session
+'''
+import cProfile
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+log = logging.getLogger('chess')
+LOG_LEVELS = ['debug', 'info', 'warning', 'error']
+
+# module -> class -> methods timed by enable()
+HOT_PATHS = {
+    'board': {'Board': ['get_moves', 'is_check', 'is_square_attacked', 'get_pins_and_checks',
+                        'get_safe_moves', 'make_move', 'unmake_move']},
+    'bitboard': {'BitBoard': ['get_moves', 'is_square_attacked', 'get_pins_and_checks', 'get_safe_moves']},
+    'game': {'Game': ['get_position_legal_moves', 'get_legal_moves', 'get_move_list', 'select', 'play_move']},
+    'gui': {'GameWindow': ['update', 'select']},  # update = one frame
+    'engine': {'Engine': ['search']},
+}
+
+timers = {}  # 'Class.method' -> [calls, total seconds, max seconds]
+wrapped = []  # (class, method name, original function) replaced by enable
+dumper = None  # thread of start_dump
+
+
+def set_log_level(level):
+    '''
+    show messages of level (debug, info, warning ...) and above on stdout
+
+    debug - board after every move, legal moves of selected piece
+    info - castling, en passant, undo / redo, search info
+    '''
+    if not log.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        log.addHandler(handler)
+        log.propagate = False
+    log.setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def timed(name, func):
+    '''return func wrapped to add its calls and time to timers[name]'''
+    timer = timers.setdefault(name, [0, 0.0, 0.0])
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            timer[0] += 1
+            timer[1] += elapsed
+            if elapsed > timer[2]:
+                timer[2] = elapsed
+    wrapper.__name__, wrapper.__doc__ = func.__name__, func.__doc__
+    return wrapper
+
+
+def enable():
+    '''start timing HOT_PATHS of imported modules'''
+    if wrapped:
+        return
+    for module_name, classes in HOT_PATHS.items():
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        for class_name, methods in classes.items():
+            cls = getattr(module, class_name)
+            for method in methods:
+                if method in cls.__dict__:  # only where the class defines it, inherited ones are timed once
+                    original = cls.__dict__[method]
+                    setattr(cls, method, timed(f'{class_name}.{method}', original))
+                    wrapped.append((cls, method, original))
+
+def disable():
+    '''stop timing, timers are kept'''
+    stop_dump()
+    while wrapped:
+        cls, method, original = wrapped.pop()
+        setattr(cls, method, original)
+
+def is_enabled():
+    return bool(wrapped)
+
+def reset():
+    for timer in timers.values():
+        timer[:] = [0, 0.0, 0.0]
+
+
+def get_stats():
+    '''name -> {calls, total_ms, mean_us, max_ms} of every timer called at least once'''
+    return {name: {'calls': calls, 'total_ms': total * 1000, 'mean_us': total / calls * 1e6, 'max_ms': slowest * 1000}
+            for name, (calls, total, slowest) in timers.items() if calls}
+
+def format_stats():
+    '''timers as a table, most total time first'''
+    stats = sorted(get_stats().items(), key=lambda item: -item[1]['total_ms'])
+    lines = [f'{"timer":<36}{"calls":>10}{"total ms":>12}{"mean us":>10}{"max ms":>10}']
+    for name, stat in stats:
+        lines.append(f'{name:<36}{stat["calls"]:>10}{stat["total_ms"]:>12.1f}{stat["mean_us"]:>10.1f}{stat["max_ms"]:>10.2f}')
+    return '\n'.join(lines)
+
+
+def start_dump(interval):
+    '''log format_stats every interval seconds (warning level, so it shows unless logging is off)'''
+    global dumper
+    stop_dump()
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            log.warning(format_stats())
+    dumper = (threading.Thread(target=run, daemon=True), stop)
+    dumper[0].start()
+
+def stop_dump():
+    global dumper
+    if dumper is not None:
+        thread, stop = dumper
+        stop.set()
+        thread.join()
+        dumper = None
+
+
+@contextmanager
+def profile(path):
+    '''
+    cProfile everything run inside the with block, stats written to path at the end
+    (python -m pstats path, or snakeviz / flameprof for a flame graph), path None profiles nothing
+    '''
+    if path is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        log.warning(f'profile written to {path}')
+
+
+def add_arguments(parser, log_level='warning'):
+    parser.add_argument('--log-level', default=log_level, choices=LOG_LEVELS, help=f'console output (default {log_level})')
+    parser.add_argument('--stats', type=float, metavar='SECONDS',
+                        help='time hot paths, log timers every SECONDS (0 - only at the end)')
+    parser.add_argument('--profile', metavar='PATH', help='write cProfile stats to PATH')
+
+@contextmanager
+def session(args):
+    '''apply add_arguments options for the with block, timers are logged at the end'''
+    set_log_level(args.log_level)
+    if args.stats is not None:
+        enable()
+        if args.stats > 0:
+            start_dump(args.stats)
+    try:
+        with profile(args.profile):
+            yield
+    finally:
+        if is_enabled():
+            disable()
+            log.warning(format_stats())
@@ -1,36 +1,75 @@
+import argparse
 import pygame
-from game import Game
+import instrument
+from gui import GameWindow
+from instrument import log
+from parallel import ParallelEngine
 from constant import *
 
-pygame.init()
+def main(engine_colour=None, time_limit=1.0, workers=1, hash_mb=16):
+    '''
+    engine_colour: colour (W / B) played by the computer, None for 2 players
+    workers: processes searching for the computer
+    hash_mb: transposition table size of each searching process
+    '''
+    pygame.init()
+    # window opened here, not at import, so search worker processes do not open one
+    win = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption('Chess')
 
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption('Chess')
-
-def main():
     run = True
-    game = Game(WIN)
+    game = GameWindow(win)
+    engine = ParallelEngine(time_limit, workers, hash_mb=hash_mb) if engine_colour else None
+    pygame.event.set_blocked(pygame.MOUSEMOTION)  # not used - would only wake the loop
 
+    # wait for input, window is only repainted where something changed
     while run:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                run = False
+        game.update()
+
+        game_over = game.checkmate or game.stalemate
+        if engine and game.turn == engine_colour and not game_over:
+            move = engine.search(game)
+            game.play_move(*move)
+            log.info(engine.get_info())
+            continue
 
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                mouse_coordinate = pygame.mouse.get_pos()
-                mouse_pos = get_pos_from_mouse(mouse_coordinate)
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            run = False
+
+        if event.type == pygame.WINDOWEXPOSED: # window uncovered - repaint everything
+            game.redraw()
+
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            if game_over: # play again / quit buttons
+                if game.click_game_end(event.pos) == 'quit':
+                    run = False
+            else:
+                mouse_pos = get_pos_from_mouse(event.pos)
                 game.select(mouse_pos)
 
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_LEFT: # left arrow key pressed
+        if event.type == pygame.KEYDOWN and not game_over:
+            if event.key == pygame.K_LEFT: # left arrow key pressed
+                game.undo()
+                if engine and game.turn == engine_colour: # take back computer move too
                     game.undo()
-                if event.key == pygame.K_RIGHT: # right arrow key pressed
+            if event.key == pygame.K_RIGHT: # right arrow key pressed
+                game.redo()
+                if engine and game.turn == engine_colour:
                     game.redo()
-        
-        game.update()
 
+    if engine:
+        engine.close()
     pygame.quit()
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='local chess')
+    parser.add_argument('--engine', choices=['W', 'B'], help='colour played by the computer')
+    parser.add_argument('--time', type=float, default=1.0, help='seconds per computer move')
+    parser.add_argument('--workers', type=int, default=1, help='processes searching for the computer')
+    parser.add_argument('--hash', type=int, default=16, help='transposition table size in MB per process, 0 for none')
+    instrument.add_arguments(parser, log_level='info')
+    args = parser.parse_args()
+    with instrument.session(args):
+        main(args.engine, args.time, args.workers, args.hash)
@@ -0,0 +1,33 @@
+class Move:
+    '''record of a move made on the board - holds everything needed to unmake it'''
+    __slots__ = ('piece', 'old_pos', 'new_pos', 'move_num', 'captured', 'captured_pos', 'rook', 'rook_pos', 'promoted',
+                 'castling', 'en_passant_pos', 'halfmove_clock', 'hash', 'san')
+
+    def __init__(self, piece, old_pos, new_pos, captured=0, captured_pos=None, rook=None, rook_pos=None, promoted=None,
+                 castling='', en_passant_pos=None, halfmove_clock=0, hash=0):
+        self.piece = piece
+        self.old_pos = old_pos
+        self.new_pos = new_pos
+        self.move_num = piece.move_num   # move_num of piece before the move
+        self.captured = captured         # captured piece (0 if none)
+        self.captured_pos = captured_pos # differs from new_pos when captured en passant
+        self.rook = rook                 # rook moved when castling
+        self.rook_pos = rook_pos         # (old pos, new pos) of rook when castling
+        self.promoted = promoted         # piece that replaced the pawn on promotion
+        self.castling = castling         # Board.castling before the move
+        self.en_passant_pos = en_passant_pos # Board.en_passant_pos before the move
+        self.halfmove_clock = halfmove_clock # Board.halfmove_clock before the move
+        self.hash = hash                 # Board.hash before the move
+        self.san = None                  # move in SAN, set by Game.play_move
+
+    def __repr__(self):
+        return f'{self.piece}({self.old_pos}->{self.new_pos})'
+
+    def is_capture(self):
+        return self.captured != 0
+
+    def is_castle(self):
+        return self.rook is not None
+
+    def is_en_passant(self):
+        return self.captured != 0 and self.captured_pos != self.new_pos
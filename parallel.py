@@ -0,0 +1,141 @@
+'''
+parallel search - root moves split over a pool of worker processes
+
+every worker gets the position (Board.get_position) and searches its share of the root moves to the
+same depth as the others, the best of their results is played. zobrist keys come from a fixed
+seed so hashes match in every process. every worker keeps its own transposition table between tasks.
+
+$ python parallel.py --depth 4 --workers 4       # speedup over single process at fixed depth
+'''
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from engine import Engine, SearchTimeout, MATE, MAX_PLY, move_name
+from instrument import log
+from game import Game
+from perft import POSITIONS, load_position
+from transposition import encode_move
+
+
+worker_engines = {}  # hash_mb -> Engine of this worker process, reused so its table survives between tasks
+
+def pack_moves(moves):
+    return [encode_move(piece.get_pos(), pos, promotion) for piece, pos, promotion in moves]
+
+def search_root_moves(position, board_class, path, colour, codes, depth, time_limit, hash_mb):
+    '''
+    worker - search root moves (packed, see encode_move) of position to depth, in the order given
+
+    returns (score, packed best move, nodes), score and move are None when time ran out
+    '''
+    game = Game(board=board_class(position=position))
+    if hash_mb not in worker_engines:
+        worker_engines[hash_mb] = Engine(hash_mb=hash_mb)
+    engine = worker_engines[hash_mb]
+    engine.time_limit = time_limit
+    engine.prepare(game, path)
+    moves = game.get_move_list(colour)
+    chosen = [moves[i] for i in map(pack_moves(moves).index, codes)]
+    try:
+        score, best = engine.search_root(chosen, colour, depth, chosen[0])
+    except SearchTimeout:
+        return None, None, engine.nodes
+    return score, codes[chosen.index(best)], engine.nodes
+
+
+class ParallelEngine(Engine):
+    '''
+    Engine searching root moves in parallel
+
+    - iterative deepening as Engine, each depth is split round robin over workers - best move of
+      previous depth goes to first worker
+    - workers do not share bounds or tables, so more nodes are searched than by a single process
+    - workers=1 (or a single legal move) runs Engine.search in this process - same result, no pool
+    - pool is started on first search and kept for following moves, close() stops it
+    '''
+    def __init__(self, time_limit=1.0, workers=None, max_depth=MAX_PLY, hash_mb=16):
+        super().__init__(time_limit, max_depth, hash_mb)
+        self.hash_mb = hash_mb
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+
+    def get_pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+
+    def search(self, game, colour=None):
+        '''return best (piece, pos, promotion) for colour (default side to move), None if no legal move'''
+        colour = colour or game.turn
+        moves = game.get_move_list(colour)
+        if self.workers <= 1 or len(moves) <= 1:
+            return super().search(game, colour)
+
+        self.prepare(game)
+        path = [record.hash for record in game.history]
+        position = game.board.get_position()
+        codes = pack_moves(moves)  # worker move lists may be in a different order
+        order = list(range(len(moves)))  # root move indices, best of last depth first
+        for depth in range(1, self.max_depth + 1):
+            remaining = None
+            if self.time_limit is not None:
+                remaining = self.deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+
+            chunks = [order[i::self.workers] for i in range(min(self.workers, len(order)))]
+            futures = [self.get_pool().submit(search_root_moves, position, type(game.board), path, colour,
+                                              [codes[i] for i in chunk], depth, remaining, self.hash_mb)
+                       for chunk in chunks]
+            results = [(score, codes.index(code) if code is not None else None, nodes)
+                       for score, code, nodes in (future.result() for future in futures)]
+            self.nodes += sum(nodes for score, index, nodes in results)
+            if any(score is None for score, index, nodes in results):
+                break
+
+            # highest score, ties go to move searched first by a single process
+            score, index, nodes = max(results, key=lambda result: (result[0], -order.index(result[1])))
+            order.remove(index)
+            order.insert(0, index)
+            self.score, self.depth = score, depth
+            self.elapsed = time.perf_counter() - self.start
+            log.info(f'{self.get_info()} best {move_name(moves[index])}')
+            if abs(score) >= MATE - MAX_PLY:  # forced mate found
+                break
+
+        self.elapsed = time.perf_counter() - self.start
+        return moves[order[0]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='compare parallel search with single process at fixed depth')
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--position', default='start', help=f'{", ".join(POSITIONS)} or a FEN string')
+    args = parser.parse_args()
+
+    position = POSITIONS[args.position][0] if args.position in POSITIONS else args.position
+    results = {}
+    for workers in (1, args.workers):
+        game = load_position(position)
+        engine = ParallelEngine(None, workers, max_depth=args.depth)
+        if workers > 1:
+            engine.get_pool()  # start workers before timing
+        move = engine.search(game)
+        engine.close()
+        results[workers] = engine.elapsed
+        print(f'workers {workers}: {move_name(move)} {engine.get_info()}')
+
+    speedup = results[1] / max(results[args.workers], 1e-9)
+    print(f'speedup {speedup:.2f}x with {args.workers} workers ({os.cpu_count()} cpus)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+'''
+perft - count leaf nodes of the legal move tree to check move generation and measure its speed
+
+$ python perft.py 3
+$ python perft.py 2 --position kiwipete --divide
+$ python perft.py 3 --position all --bitboard
+'''
+import argparse
+import time
+from game import Game
+from board import Board
+from bitboard import BitBoard
+from constant import *
+
+# name -> (position, known node counts for depth 1, 2, 3 ...)
+POSITIONS = {
+    'start': ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -',
+              [20, 400, 8902, 197281, 4865609]),
+    'kiwipete': ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq -',
+                 [48, 2039, 97862, 4085603]),
+    'position3': ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - -',
+                  [14, 191, 2812, 43238, 674624]),
+    'position4': ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq -',
+                  [6, 264, 9467, 422333]),
+    'position5': ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ -',
+                  [44, 1486, 62379, 2103487]),
+    'position6': ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - -',
+                  [46, 2079, 89890, 3894594]),
+}
+
+def load_position(fen, board_class=Board):
+    '''create game from FEN string'''
+    return Game(board=board_class(fen))
+
+
+def perft(game, depth):
+    '''count leaf nodes of legal move tree to depth'''
+    if depth == 0:
+        return 1
+
+    moves = game.get_move_list(game.turn)
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    board = game.board
+    for piece, pos, promotion in moves:
+        record = board.make_move(piece, pos, promotion)
+        game.turn = get_opposite_colour(game.turn)
+        nodes += perft(game, depth - 1)
+        game.turn = get_opposite_colour(game.turn)
+        board.unmake_move(record)
+    return nodes
+
+
+def divide(game, depth):
+    '''return node count below each root move'''
+    counts = {}
+    board = game.board
+    for piece, pos, promotion in game.get_move_list(game.turn):
+        name = convert_to_notation(piece.get_pos()) + convert_to_notation(pos) + (promotion or '').lower()
+        record = board.make_move(piece, pos, promotion)
+        game.turn = get_opposite_colour(game.turn)
+        counts[name] = perft(game, depth - 1)
+        game.turn = get_opposite_colour(game.turn)
+        board.unmake_move(record)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='count leaf nodes of the legal move tree')
+    parser.add_argument('depth', type=int, nargs='?', default=3)
+    parser.add_argument('--position', default='start', help=f'all, {", ".join(POSITIONS)} or a FEN string')
+    parser.add_argument('--divide', action='store_true', help='show node count below each root move')
+    parser.add_argument('--bitboard', action='store_true', help='use BitBoard backend')
+    args = parser.parse_args()
+
+    if args.position == 'all':
+        positions = list(POSITIONS.items())
+    elif args.position in POSITIONS:
+        positions = [(args.position, POSITIONS[args.position])]
+    else:
+        positions = [('fen', (args.position, []))]
+
+    board_class = BitBoard if args.bitboard else Board
+    failed = False
+    for name, (position, expected) in positions:
+        game = load_position(position, board_class)
+
+        start = time.perf_counter()
+        if args.divide:
+            counts = divide(game, args.depth)
+            for move in sorted(counts):
+                print(f'{move}: {counts[move]}')
+            nodes = sum(counts.values())
+        else:
+            nodes = perft(game, args.depth)
+        elapsed = time.perf_counter() - start
+
+        status = ''
+        if args.depth <= len(expected):
+            ok = nodes == expected[args.depth - 1]
+            failed = failed or not ok
+            status = 'OK' if ok else f'FAIL (expected {expected[args.depth - 1]})'
+        print(f'{name} depth {args.depth}: {nodes} nodes {elapsed:.2f}s {nodes / max(elapsed, 1e-9):.0f} nodes/s {status}')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
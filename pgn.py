@@ -0,0 +1,214 @@
+'''
+PGN reader - SAN moves matched against the legal move generator, bulk replay over a process pool
+
+games are read one at a time from the file, so archives of any size can be replayed
+
+$ python pgn.py games.pgn --workers 4
+'''
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from board import Board
+from game import Game
+from constant import *
+from piece import *
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+SAN_PIECES = {'N': Knight, 'B': Bishop, 'R': Rook, 'Q': Queen, 'K': King}
+
+TAG_RE = re.compile(r'\[(\w+)\s+"(.*)"\]')
+COMMENT_RE = re.compile(r'\{[^}]*\}|;[^\n]*')
+TOKEN_RE = re.compile(r'\(|\)|[^\s()]+')
+MOVE_NUMBER_RE = re.compile(r'^\d+\.+')
+SAN_RE = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$')
+
+
+def read_games(file):
+    '''
+    yield (tags, movetext) of every game in open PGN file
+
+    tags - dict of tag name -> value, movetext - lines of moves, comments and result joined with newlines
+    (kept apart so a ; comment ends at the end of its line)
+    '''
+    tags, lines = {}, []
+    for line in file:
+        line = line.strip()
+        if line.startswith('['):
+            if lines:  # tag of next game
+                yield tags, '\n'.join(lines)
+                tags, lines = {}, []
+            match = TAG_RE.match(line)
+            if match:
+                tags[match.group(1)] = match.group(2)
+        elif line and not line.startswith('%'):
+            lines.append(line)
+    if tags or lines:
+        yield tags, '\n'.join(lines)
+
+
+def get_sans(movetext):
+    '''return SAN moves of main line - comments, variations, move numbers, NAGs and result removed'''
+    sans = []
+    depth = 0  # nesting of variations
+    for token in TOKEN_RE.findall(COMMENT_RE.sub(' ', movetext)):
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth == 0 and token not in RESULTS and not token.startswith('$'):
+            token = MOVE_NUMBER_RE.sub('', token)
+            if token:
+                sans.append(token)
+    return sans
+
+
+def parse_san(game, san):
+    '''
+    return legal move (piece, pos, promotion) of side to move written as SAN
+
+    raises ValueError if san can not be read or is not legal in position
+    '''
+    text = san.rstrip('+#!?')
+    colour = game.turn
+
+    if text in ('O-O', 'O-O-O', '0-0', '0-0-0'):
+        king = game.board.get_king(colour)
+        pos = (king.col + 2 if len(text) == 3 else king.col - 2, king.row)
+        if pos not in game.iter_legal_moves(king):
+            raise ValueError(f'illegal move {san}')
+        return king, pos, None
+
+    match = SAN_RE.match(text)
+    if match is None:
+        raise ValueError(f'invalid move {san}')
+    letter, from_file, from_rank, square, promotion = match.groups()
+    piece_class = SAN_PIECES[letter] if letter else Pawn
+    pos = convert_to_pos(square)
+
+    # only pieces of the right type (and file / rank when given) are asked for legal moves
+    found = None
+    for piece in list(game.board.get_pieces(colour)):
+        if type(piece) is not piece_class:
+            continue
+        notation = piece.get_pos_notation()
+        if (from_file and notation[0] != from_file) or (from_rank and notation[1] != from_rank):
+            continue
+        if pos in game.iter_legal_moves(piece):
+            if found is not None:
+                raise ValueError(f'ambiguous move {san}')
+            found = piece
+
+    if found is None:
+        raise ValueError(f'illegal move {san}')
+    if (piece_class is Pawn and pos[1] in (0, ROWS - 1)) != (promotion is not None):
+        raise ValueError(f'illegal move {san} (promotion)')
+    return found, pos, promotion
+
+
+def load_game(tags):
+    '''return Game at start position of tags (FEN tag or standard start), checkmate / stalemate already set'''
+    fen = tags.get('FEN')
+    return Game(board=Board(fen) if fen else Board())
+
+
+def replay(game, sans):
+    '''play SAN moves on game board, returns number of moves played'''
+    board = game.board
+    for ply, san in enumerate(sans, 1):
+        try:
+            piece, pos, promotion = parse_san(game, san)
+        except ValueError as e:
+            raise ValueError(f'ply {ply}: {e}') from None
+        board.make_move(piece, pos, promotion)
+        game.turn = board.turn
+    return len(sans)
+
+
+def replay_games(games):
+    '''
+    worker - replay list of (number, tags, movetext)
+
+    returns (games, plies, errors) - errors are (number of game, message)
+    '''
+    plies, errors = 0, []
+    for number, tags, movetext in games:
+        sans = get_sans(movetext)
+        try:
+            game = load_game(tags)
+            plies += replay(game, sans)
+        except ValueError as e:
+            errors.append((number, f'{e} ({tags.get("White", "?")} - {tags.get("Black", "?")})'))
+    return len(games), plies, errors
+
+
+def iter_batches(file, size):
+    '''yield lists of (number, tags, movetext) of up to size games'''
+    batch = []
+    for number, (tags, movetext) in enumerate(read_games(file), 1):
+        batch.append((number, tags, movetext))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def replay_file(path, workers=1, batch_size=100):
+    '''
+    replay every game of PGN file, workers > 1 spreads batches of games over processes
+
+    only a few batches per worker are read ahead, so memory use does not grow with file size
+    returns (games, plies, errors)
+    '''
+    total_games, total_plies, all_errors = 0, 0, []
+
+    def add(result):
+        nonlocal total_games, total_plies
+        games, plies, errors = result
+        total_games += games
+        total_plies += plies
+        all_errors.extend(errors)
+
+    with open(path, encoding='utf-8', errors='replace') as file:
+        if workers <= 1:
+            for batch in iter_batches(file, batch_size):
+                add(replay_games(batch))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = set()
+                for batch in iter_batches(file, batch_size):
+                    if len(pending) >= 2 * workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            add(future.result())
+                    pending.add(pool.submit(replay_games, batch))
+                for future in pending:
+                    add(future.result())
+
+    all_errors.sort()
+    return total_games, total_plies, all_errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='replay and validate every game of a PGN file')
+    parser.add_argument('path')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--batch', type=int, default=100, help='games sent to a worker at a time')
+    parser.add_argument('--errors', type=int, default=20, help='number of errors to show')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    games, plies, errors = replay_file(args.path, args.workers, args.batch)
+    elapsed = time.perf_counter() - start
+
+    for number, message in errors[:args.errors]:
+        print(f'game {number}: {message}')
+    print(f'{games} games {plies} plies {len(errors)} errors {elapsed:.2f}s '
+          f'{games / max(elapsed, 1e-9):.1f} games/s {plies / max(elapsed, 1e-9):.0f} plies/s')
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
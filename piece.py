@@ -1,7 +1,15 @@
-import pygame
 from constant import *
 
+# (row, col) steps of each piece
+KNIGHT_STEPS = [(-2, -1), (-2, +1), (+2, -1), (+2, +1), (-1, -2), (-1, +2), (+1, -2), (+1, +2)]
+BISHOP_STEPS = [(+1, +1), (-1, -1), (+1, -1), (-1, +1)]
+ROOK_STEPS = [(+1, 0), (0, +1), (-1, 0), (0, -1)]
+QUEEN_STEPS = ROOK_STEPS + BISHOP_STEPS
+KING_STEPS = QUEEN_STEPS
+
 class Piece:
+    __slots__ = ('row', 'col', 'colour', 'selected', 'move_num')
+
     def __init__(self, col, row, colour):
         self.row = row 
         self.col = col
@@ -48,20 +56,14 @@ class Piece:
 
 
 class Pawn(Piece):
+    __slots__ = ()
+
     def __init__(self, col, row, colour):
         super().__init__(col, row, colour)
     
     def __repr__(self):
         return self.colour + 'P'
 
-    def show(self, win):
-        '''display image on screen'''
-        if self.colour == 'W':
-            img = W_PAWN
-        else:
-            img = B_PAWN
-        win.blit(img, self.get_coordinate())
-
     def get_moves(self, board):
         '''return list of standard moves that piece can make'''
         moves = []
@@ -119,22 +121,17 @@ class Pawn(Piece):
 
 
 class Knight(Piece):
+    __slots__ = ()
+
     def __init__(self, col, row, colour):
         super().__init__(col, row, colour)
     
     def __repr__(self):
         return self.colour + 'N'
 
-    def show(self, win):
-        if self.colour == 'W':
-            img = W_KNIGHT
-        else:
-            img = B_KNIGHT
-        win.blit(img, self.get_coordinate())
-
     def get_moves(self, board):
         moves = []
-        steps = [(-2, -1), (-2, +1), (+2, -1), (+2, +1), (-1, -2), (-1, +2), (+1, -2), (+1, +2)]
+        steps = KNIGHT_STEPS
         for step in steps:
             col, row = self.get_pos()
             col += step[1]
@@ -154,22 +151,17 @@ class Knight(Piece):
 
 
 class Bishop(Piece):
+    __slots__ = ()
+
     def __init__(self, col, row, colour):
         super().__init__(col, row, colour)
     
     def __repr__(self):
         return self.colour + 'B'
 
-    def show(self, win):
-        if self.colour == 'W':
-            img = W_BISHOP
-        else:
-            img = B_BISHOP
-        win.blit(img, self.get_coordinate())
-
     def get_moves(self, board):
         moves = []
-        steps = [(+1, +1), (-1, -1), (+1, -1), (-1, +1)]
+        steps = BISHOP_STEPS
         for step in steps:
             col, row = self.get_pos()
             stop = False
@@ -196,22 +188,17 @@ class Bishop(Piece):
 
 
 class Rook(Piece):
+    __slots__ = ()
+
     def __init__(self, col, row, colour):
         super().__init__(col, row, colour)
     
     def __repr__(self):
         return self.colour + 'R'
 
-    def show(self, win):
-        if self.colour == 'W':
-            img = W_ROOK
-        else:
-            img = B_ROOK
-        win.blit(img, self.get_coordinate())
-
     def get_moves(self, board):
         moves = []
-        steps = [(+1, 0), (0, +1), (-1, 0), (0, -1)]
+        steps = ROOK_STEPS
         for step in steps:
             col, row = self.get_pos()
             stop = False
@@ -239,23 +226,17 @@ class Rook(Piece):
 
 
 class Queen(Piece):
+    __slots__ = ()
+
     def __init__(self, col, row, colour):
         super().__init__(col, row, colour)
     
     def __repr__(self):
         return self.colour + 'Q'
 
-    def show(self, win):
-        if self.colour == 'W':
-            img = W_QUEEN
-        else:
-            img = B_QUEEN
-        win.blit(img, self.get_coordinate())
-
     def get_moves(self, board):
         moves = []
-        steps = [(+1, 0), (0, +1), (-1, 0), (0, -1),      # horizontal and vertical steps
-                (+1, +1), (-1, -1), (+1, -1), (-1, +1)]  # diagonal steps  
+        steps = QUEEN_STEPS  # horizontal, vertical and diagonal steps
         for step in steps:
             col, row = self.get_pos()
             stop = False
@@ -283,27 +264,17 @@ class Queen(Piece):
 
 
 class King(Piece):
+    __slots__ = ()
+
     def __init__(self, col, row, colour):
         super().__init__(col, row, colour)
     
     def __repr__(self):
         return self.colour + 'K'
 
-    def show(self, win):
-        if self.colour == 'W':
-            img = W_KING
-        else:
-            img = B_KING
-        win.blit(img, self.get_coordinate())
-
-    def draw_check(self, win):
-        '''draw red circle behind king when in check'''
-        win.blit(R_CIRCLE, self.get_coordinate())
-
     def get_moves(self, board):
         moves = []
-        steps = [(+1, 0), (0, +1), (-1, 0), (0, -1),      # horizontal and vertical steps
-                (+1, +1), (-1, -1), (+1, -1), (-1, +1)]  # diagonal steps  
+        steps = KING_STEPS  # horizontal, vertical and diagonal steps
         for step in steps:
             col, row = self.get_pos()
             col += step[1]
@@ -319,3 +290,8 @@ class King(Piece):
                     moves.append((col, row))
 
         return moves
+
+
+
+# piece created when pawn promotes - key is choice in Game.promote_pawn
+PROMOTION_PIECES = {'Q': Queen, 'R': Rook, 'B': Bishop, 'N': Knight}
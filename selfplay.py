@@ -0,0 +1,228 @@
+'''
+self-play - complete games played without a window, spread over a pool of worker processes
+
+moves are random legal moves or engine moves (engine vs engine), optionally after a scripted start
+(moves of the games of a PGN file, from their FEN tag if they have one). engine games open with a
+few random plies so they differ, and every game gets a new engine (empty transposition table), so a
+game only depends on the seed and its number - not on the worker or the games played before it
+(searches with a time limit are the exception). promotions are picked from the move list, so the
+input() prompt of Game.promote_pawn is never reached. a game ends with checkmate, stalemate, 50 move
+rule, threefold repetition, insufficient material or the ply limit.
+
+$ python selfplay.py 1000 --workers 4                       # random games
+$ python selfplay.py 20 --mode engine --depth 2 --output games.bin
+$ python selfplay.py 500 --script openings.pgn --output games.bin
+
+output file - per game: header (game number, result, reason, plies) then plies 16 bit packed
+moves (see encode_move), read back with read_results
+'''
+import argparse
+import os
+import random
+import struct
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import instrument
+from engine import Engine
+from pgn import read_games, get_sans, parse_san, load_game
+from transposition import encode_move
+from piece import *
+
+RESULTS = ['1-0', '0-1', '1/2-1/2', '*']
+REASONS = ['checkmate', 'stalemate', 'fifty moves', 'repetition', 'material', 'max plies']
+HEADER = struct.Struct('<IBBH')  # game number, result, reason, plies
+
+
+def get_draw_reason(game, seen):
+    '''reason the game is drawn after the last move (not counting stalemate), None if it goes on'''
+    board = game.board
+    if board.halfmove_clock >= 100:
+        return 'fifty moves'
+    if seen.get(board.get_hash(), 0) >= 3:
+        return 'repetition'
+    pieces = board.get_pieces('W') + board.get_pieces('B')
+    if len(pieces) <= 3 and all(isinstance(piece, (King, Knight, Bishop)) for piece in pieces):
+        return 'material'  # kings alone or with a single minor piece
+    return None
+
+
+def play_game(number, script, mode, max_plies, depth, time_limit, seed, random_plies=4):
+    '''
+    play one game - script (tags, SAN moves) first, then random / engine moves
+
+    random_plies: engine mode - random moves played after the script before the engine takes over
+    returns (number, result, reason, packed moves), seconds of every move generation
+    '''
+    rnd = random.Random(seed * 1000003 + number)  # same game whichever worker plays it
+    engine = None
+    if mode == 'engine':
+        engine = Engine(time_limit, max_depth=depth, hash_mb=4)  # new table - nothing carried over from other games
+
+    tags, script = script
+    game = load_game(tags)
+    seen = {game.board.get_hash(): 1}
+    moves, latencies = array('H'), []
+    reason = 'checkmate' if game.checkmate else 'stalemate' if game.stalemate else None  # FEN tag may be over already
+    while reason is None:
+        if len(moves) >= max_plies:
+            reason = 'max plies'
+            break
+
+        start = time.perf_counter()
+        move_list = game.get_move_list(game.turn)
+        latencies.append(time.perf_counter() - start)
+
+        if len(moves) < len(script):
+            try:
+                move = parse_san(game, script[len(moves)])
+            except ValueError as e:
+                raise ValueError(f'game {number} ply {len(moves) + 1}: {e}') from None
+        elif engine is not None and len(moves) >= len(script) + random_plies:
+            move = engine.search(game)
+        else:
+            move = rnd.choice(move_list)
+
+        piece, pos, promotion = move
+        moves.append(encode_move(piece.get_pos(), pos, promotion))
+        game.play_move(piece, pos, promotion)
+        key = game.board.get_hash()
+        seen[key] = seen.get(key, 0) + 1
+
+        if game.checkmate:
+            reason = 'checkmate'
+        elif game.stalemate:
+            reason = 'stalemate'
+        else:
+            reason = get_draw_reason(game, seen)
+
+    if reason == 'checkmate':
+        result = game.get_result()
+    elif reason == 'max plies':
+        result = '*'
+    else:
+        result = '1/2-1/2'
+    return (number, result, reason, moves), latencies
+
+
+def play_games(batch, mode, max_plies, depth, time_limit, seed, random_plies):
+    '''worker - play list of (number, script), see play_game, returns list of games, seconds of move generations'''
+    games, latencies = [], []
+    for number, script in batch:
+        game, game_latencies = play_game(number, script, mode, max_plies, depth, time_limit, seed, random_plies)
+        games.append(game)
+        latencies.extend(game_latencies)
+    return games, latencies
+
+
+def write_game(file, game):
+    number, result, reason, moves = game
+    file.write(HEADER.pack(number, RESULTS.index(result), REASONS.index(reason), len(moves)))
+    file.write(moves.tobytes())
+
+def read_results(path):
+    '''yield (number, result, reason, packed moves) of every game of output file'''
+    with open(path, 'rb') as file:
+        while True:
+            header = file.read(HEADER.size)
+            if not header:
+                break
+            number, result, reason, plies = HEADER.unpack(header)
+            moves = array('H')
+            moves.frombytes(file.read(2 * plies))
+            yield number, RESULTS[result], REASONS[reason], moves
+
+
+def load_scripts(path):
+    '''(tags, SAN moves) of every game of PGN file'''
+    with open(path, encoding='utf-8', errors='replace') as file:
+        return [(tags, get_sans(movetext)) for tags, movetext in read_games(file)]
+
+
+def run(games, workers=1, mode='random', max_plies=400, depth=2, time_limit=None, seed=1,
+        scripts=None, batch_size=10, output=None, random_plies=4):
+    '''
+    play games, written to output file (path) as they finish if given
+
+    returns {results: result -> count, reasons: reason -> count, plies, latencies (sorted seconds)}
+    '''
+    scripts = scripts or [({}, [])]
+    summary = {'results': dict.fromkeys(RESULTS, 0), 'reasons': dict.fromkeys(REASONS, 0), 'plies': 0}
+    latencies = []
+    file = open(output, 'wb') if output else None
+
+    def add(played):
+        finished, batch_latencies = played
+        for game in finished:
+            number, result, reason, moves = game
+            summary['results'][result] += 1
+            summary['reasons'][reason] += 1
+            summary['plies'] += len(moves)
+            if file is not None:
+                write_game(file, game)
+        latencies.extend(batch_latencies)
+
+    batches = ([(number, scripts[number % len(scripts)]) for number in range(start, min(start + batch_size, games))]
+               for start in range(0, games, batch_size))
+    args = (mode, max_plies, depth, time_limit, seed, random_plies)
+    try:
+        if workers <= 1:
+            for batch in batches:
+                add(play_games(batch, *args))
+        else:
+            # only a few batches per worker in flight - results are counted as they come in
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = set()
+                for batch in batches:
+                    if len(pending) >= 2 * workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            add(future.result())
+                    pending.add(pool.submit(play_games, batch, *args))
+                for future in pending:
+                    add(future.result())
+    finally:
+        if file is not None:
+            file.close()
+
+    latencies.sort()
+    summary['latencies'] = latencies
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='play complete games without a window')
+    parser.add_argument('games', type=int)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--mode', choices=['random', 'engine'], default='random', help='how moves are picked')
+    parser.add_argument('--depth', type=int, default=2, help='engine: search depth')
+    parser.add_argument('--time', type=float, help='engine: seconds per move (default no limit)')
+    parser.add_argument('--plies', type=int, default=400, help='game is stopped (*) after this many plies')
+    parser.add_argument('--random-plies', type=int, default=4, help='engine: random moves before the engine plays')
+    parser.add_argument('--script', help='PGN file - game n starts with the moves of game n of the file')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--batch', type=int, default=10, help='games sent to a worker at a time')
+    parser.add_argument('--output', help='write games to this file (packed moves)')
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    scripts = load_scripts(args.script) if args.script else None
+    with instrument.session(args):
+        start = time.perf_counter()
+        summary = run(args.games, args.workers, args.mode, args.plies, args.depth, args.time, args.seed,
+                      scripts, args.batch, args.output, args.random_plies)
+        elapsed = time.perf_counter() - start
+
+    plies, latencies = summary['plies'], summary['latencies']
+    def percentile(p):
+        return latencies[min(int(p * len(latencies)), len(latencies) - 1)] * 1e6 if latencies else 0
+    print(f'{args.games} games {plies} plies in {elapsed:.2f}s - {args.games / elapsed:.1f} games/s '
+          f'{plies / elapsed:.0f} plies/s ({args.workers} workers)')
+    print('results ' + ' '.join(f'{result} {count}' for result, count in summary['results'].items()))
+    print('endings ' + ' '.join(f'{reason} {count}' for reason, count in summary['reasons'].items() if count))
+    print(f'move generation us p50 {percentile(0.5):.0f} p99 {percentile(0.99):.0f} '
+          f'p99.9 {percentile(0.999):.0f} max {percentile(1):.0f}')
+
+
+if __name__ == '__main__':
+    main()
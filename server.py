@@ -0,0 +1,383 @@
+'''
+game server - many headless games on one asyncio event loop over a local TCP socket
+
+protocol: one JSON object per line each way, requests may carry an "id" that is sent back
+    {"cmd": "new"}                                      -> {"game": 1, "fen": ...}
+    {"cmd": "move", "game": 1, "move": "e2e4"}          -> status of game (promotion: "e7e8q")
+    {"cmd": "undo" / "redo" / "status", "game": 1}      -> status of game
+    {"cmd": "legal", "game": 1}                         -> {"moves": ["a2a3", ...]}
+    {"cmd": "engine", "game": 1}                        -> computer plays a move, status of game
+    {"cmd": "close", "game": 1}                         -> game removed
+    {"cmd": "stats"}                                    -> requests, throughput, latency
+errors are answered with {"error": message}
+
+engine searches run in a process pool so they do not hold up the other games, legal moves
+are computed on the loop (once per position, from the cache of Game)
+
+$ python server.py serve --port 8765
+$ python server.py load --games 500 --port 8765       # load test running server
+$ python server.py load --games 500                   # load test server started in this process
+'''
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import instrument
+from board import Board
+from instrument import log
+from engine import Engine
+from transposition import encode_move, decode_move
+from game import Game
+from constant import *
+from piece import *
+
+PORT = 8765
+
+worker_engines = {}  # (time_limit, hash_mb) -> Engine of this worker process
+
+
+def search_move(position, path, time_limit, hash_mb):
+    '''worker - return engine move (packed, see encode_move) for side to move of position (Board.get_position), None if there is none'''
+    key = (time_limit, hash_mb)
+    if key not in worker_engines:
+        worker_engines[key] = Engine(time_limit, hash_mb=hash_mb)
+    game = Game(board=Board(position=position))
+    move = worker_engines[key].search(game, path=path)
+    if move is None:
+        return None
+    piece, pos, promotion = move
+    return encode_move(piece.get_pos(), pos, promotion)
+
+
+def get_move_name(old_pos, new_pos, promotion=None):
+    return convert_to_notation(old_pos) + convert_to_notation(new_pos) + (promotion or '').lower()
+
+def parse_move_name(name):
+    '''return (old pos, new pos, promotion) of move written as e2e4 / e7e8q'''
+    if len(name) not in (4, 5) or name[0] not in 'abcdefgh' or name[2] not in 'abcdefgh' \
+            or name[1] not in '12345678' or name[3] not in '12345678':
+        raise ValueError(f'invalid move {name}')
+    promotion = name[4].upper() if len(name) == 5 else None
+    if promotion is not None and promotion not in PROMOTION_PIECES:
+        raise ValueError(f'invalid promotion {name}')
+    return convert_to_pos(name[:2]), convert_to_pos(name[2:4]), promotion
+
+
+class GameServer:
+    '''
+    hosts headless games by id - requests of one game are handled one at a time (lock),
+    requests of different games run concurrently
+    '''
+    def __init__(self, workers=1, time_limit=0.1, hash_mb=4):
+        self.games = {}  # id -> Game
+        self.locks = {}  # id -> asyncio.Lock
+        self.next_id = 1
+        self.time_limit = time_limit
+        self.hash_mb = hash_mb
+        # spawned, not forked - a forked worker would inherit (and keep open) client sockets
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.start = time.perf_counter()
+        self.requests = 0
+        self.connections = 0  # open client connections
+        self.latencies = deque(maxlen=100000)  # seconds of latest requests
+        self.game_latency = {}  # id -> [requests, total seconds, max seconds]
+        self.slowest_closed = [0, 0, 0]  # game_latency of closed game with slowest request
+
+    def get_stats(self):
+        elapsed = time.perf_counter() - self.start
+        latencies = sorted(self.latencies)
+        def percentile(p):
+            return latencies[min(int(p * len(latencies)), len(latencies) - 1)] * 1000 if latencies else 0
+        slowest = max([*self.game_latency.values(), self.slowest_closed], key=lambda item: item[2])
+        return {'games': len(self.games), 'requests': self.requests,
+                'requests_per_sec': self.requests / max(elapsed, 1e-9),
+                'latency_ms': {'p50': percentile(0.5), 'p99': percentile(0.99), 'max': percentile(1)},
+                'slowest_game_ms': {'mean': slowest[1] / max(slowest[0], 1) * 1000, 'max': slowest[2] * 1000},
+                'timers': instrument.get_stats()}  # empty unless started with --stats
+
+    def close(self):
+        self.executor.shutdown()
+
+
+    async def handle_connection(self, reader, writer):
+        '''read requests of one client, every request is handled in its own task'''
+        write_lock = asyncio.Lock()
+        tasks = set()
+        self.connections += 1
+
+        async def respond(request):
+            response = await self.handle_request(request)
+            if 'id' in request:
+                response['id'] = request['id']
+            async with write_lock:
+                writer.write((json.dumps(response) + '\n').encode())
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = None
+                if not isinstance(request, dict):
+                    request = {'cmd': None}
+                task = asyncio.create_task(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def handle_request(self, request):
+        '''answer request - every failure is answered with {"error": message}, never left unanswered'''
+        start = time.perf_counter()
+        game_id = None
+        try:
+            cmd = request.get('cmd')
+            if cmd == 'new':
+                fen = request.get('fen')
+                if fen is not None and not isinstance(fen, str):
+                    raise ValueError('fen must be a string')
+                response = self.new_game(fen)
+                game_id = response['game']
+            elif cmd == 'stats':
+                response = self.get_stats()
+            elif cmd in ('move', 'undo', 'redo', 'status', 'legal', 'engine', 'close'):
+                requested = request.get('game')
+                if not isinstance(requested, int) or isinstance(requested, bool):
+                    raise ValueError('game must be a number')
+                game_id = requested
+                if game_id not in self.games:
+                    raise ValueError(f'no game {game_id}')
+                async with self.locks[game_id]:
+                    # an earlier request of the game may have closed it while this one waited
+                    if game_id not in self.games:
+                        raise ValueError(f'no game {game_id}')
+                    response = await self.handle_game_request(cmd, game_id, request)
+            else:
+                raise ValueError(f'unknown command {cmd}')
+        except ValueError as e:
+            response = {'error': str(e)}
+        except Exception as e:
+            log.exception(f'request {request} failed')
+            response = {'error': f'internal error ({type(e).__name__}: {e})'}
+
+        latency = time.perf_counter() - start
+        self.requests += 1
+        self.latencies.append(latency)
+        if game_id in self.games:  # per game latency kept until game is closed
+            item = self.game_latency.setdefault(game_id, [0, 0, 0])
+            item[0] += 1
+            item[1] += latency
+            item[2] = max(item[2], latency)
+        return response
+
+    async def handle_game_request(self, cmd, game_id, request):
+        game = self.games[game_id]
+        if cmd == 'move':
+            move = request.get('move')
+            if not isinstance(move, str):
+                raise ValueError('move must be a string (e.g. e2e4)')
+            self.play(game, *parse_move_name(move))
+        elif cmd == 'undo':
+            game.undo()
+        elif cmd == 'redo':
+            game.redo()
+        elif cmd == 'legal':
+            return {'game': game_id, 'moves': self.get_legal_move_names(game)}
+        elif cmd == 'engine':
+            if game.checkmate or game.stalemate:
+                raise ValueError('game is over')
+            path = [record.hash for record in game.history]
+            loop = asyncio.get_running_loop()
+            move = await loop.run_in_executor(self.executor, search_move, game.board.get_position(), path,
+                                              self.time_limit, self.hash_mb)
+            if move is None:
+                raise ValueError('game is over')
+            self.play(game, *decode_move(move))
+        elif cmd == 'close':
+            del self.games[game_id]
+            del self.locks[game_id]
+            requests, total, slowest = self.game_latency.pop(game_id, [0, 0, 0])
+            if slowest > self.slowest_closed[2]:
+                self.slowest_closed = [requests, total, slowest]
+            return {'game': game_id, 'closed': True, 'requests': requests,
+                    'latency_ms': {'mean': total / max(requests, 1) * 1000, 'max': slowest * 1000}}
+        return self.get_status(game_id)
+
+
+    def new_game(self, fen=None):
+        game_id = self.next_id
+        self.next_id += 1
+        self.games[game_id] = Game(board=Board(fen) if fen else Board())
+        self.locks[game_id] = asyncio.Lock()
+        return self.get_status(game_id)
+
+    def play(self, game, old_pos, new_pos, promotion):
+        '''play move if legal for side to move - same checks as Game.select, promotion piece must be given'''
+        if game.checkmate or game.stalemate:
+            raise ValueError('game is over')
+        piece = game.board.get_piece(old_pos)
+        if piece == 0 or piece.get_colour() != game.turn or new_pos not in game.get_position_legal_moves()[old_pos]:
+            raise ValueError(f'illegal move {get_move_name(old_pos, new_pos, promotion)}')
+        if isinstance(piece, Pawn) and new_pos[1] in (0, ROWS - 1):
+            if promotion is None:
+                raise ValueError('promotion piece needed (e.g. e7e8q)')
+        elif promotion is not None:
+            raise ValueError(f'illegal move {get_move_name(old_pos, new_pos, promotion)}')
+        game.play_move(piece, new_pos, promotion)
+
+    def get_legal_move_names(self, game):
+        '''legal moves of side to move from the legal move cache of game (filled when the move was played)'''
+        names = []
+        for old_pos, positions in game.get_position_legal_moves().items():
+            piece = game.board.get_piece(old_pos)
+            for pos in positions:
+                if isinstance(piece, Pawn) and pos[1] in (0, ROWS - 1):
+                    names.extend(get_move_name(old_pos, pos, choice) for choice in PROMOTION_PIECES)
+                else:
+                    names.append(get_move_name(old_pos, pos))
+        return names
+
+    def get_status(self, game_id):
+        game = self.games[game_id]
+        return {'game': game_id, 'fen': game.get_fen(), 'turn': game.turn, 'check': game.check,
+                'checkmate': game.checkmate, 'stalemate': game.stalemate, 'result': game.get_result(),
+                'moves': game.get_san_moves()}
+
+
+async def serve(port, workers, time_limit):
+    game_server = GameServer(workers, time_limit)
+    server = await asyncio.start_server(game_server.handle_connection, '127.0.0.1', port)
+    print(f'serving on 127.0.0.1:{port}')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        game_server.close()
+
+
+class Client:
+    '''local client - sends requests over one connection, responses are matched by id'''
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 1
+        self.waiting = {}  # id -> future of response
+        self.latencies = []  # round trip seconds of every request
+        self.receiver = asyncio.create_task(self.receive())
+
+    async def receive(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            self.waiting.pop(response['id']).set_result(response)
+
+    async def request(self, cmd, **fields):
+        request_id = self.next_id
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+        start = time.perf_counter()
+        self.writer.write((json.dumps({'cmd': cmd, 'id': request_id, **fields}) + '\n').encode())
+        await self.writer.drain()
+        response = await future
+        self.latencies.append(time.perf_counter() - start)
+        return response
+
+    async def close(self):
+        self.writer.close()
+        self.receiver.cancel()
+
+
+async def play_random_game(client, rnd, max_plies, engine_every):
+    '''play random legal moves (every engine_every-th move by the engine) until game over or max plies'''
+    status = await client.request('new')
+    game_id = status['game']
+    for ply in range(max_plies):
+        if status['checkmate'] or status['stalemate']:
+            break
+        if engine_every and ply % engine_every == engine_every - 1:
+            status = await client.request('engine', game=game_id)
+        else:
+            moves = (await client.request('legal', game=game_id))['moves']
+            status = await client.request('move', game=game_id, move=rnd.choice(moves))
+        if 'error' in status:
+            raise RuntimeError(status['error'])
+    await client.request('close', game=game_id)
+    return ply + 1
+
+
+async def load_test(port, games, connections, max_plies, engine_every, workers, time_limit):
+    '''play games concurrently over connections, report throughput and round trip latency'''
+    game_server = server = None
+    if port is None:  # server in this process
+        game_server = GameServer(workers, time_limit)
+        server = await asyncio.start_server(game_server.handle_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+
+    clients = [Client(*await asyncio.open_connection('127.0.0.1', port)) for _ in range(connections)]
+    rnd = random.Random(1)
+    start = time.perf_counter()
+    plies = await asyncio.gather(*(play_random_game(clients[i % connections], rnd, max_plies, engine_every)
+                                   for i in range(games)))
+    elapsed = time.perf_counter() - start
+    stats = await clients[0].request('stats')
+
+    latencies = sorted(latency for client in clients for latency in client.latencies)
+    def percentile(p):
+        return latencies[min(int(p * len(latencies)), len(latencies) - 1)] * 1000
+    print(f'{games} games {sum(plies)} plies {len(latencies)} requests in {elapsed:.2f}s - '
+          f'{len(latencies) / elapsed:.0f} requests/s {sum(plies) / elapsed:.0f} plies/s')
+    print(f'round trip latency ms p50 {percentile(0.5):.2f} p99 {percentile(0.99):.2f} max {percentile(1):.2f}')
+    print(f'server {json.dumps(stats)}')
+
+    for client in clients:
+        await client.close()
+    if server is not None:
+        while game_server.connections:  # let handlers see the clients leave before stopping
+            await asyncio.sleep(0.01)
+        server.close()
+        await server.wait_closed()
+        game_server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='asyncio server of headless games')
+    parser.add_argument('mode', choices=['serve', 'load'])
+    parser.add_argument('--port', type=int, help=f'serve: port (default {PORT}), load: port of running server')
+    parser.add_argument('--workers', type=int, default=1, help='engine processes')
+    parser.add_argument('--time', type=float, default=0.05, help='seconds per engine move')
+    parser.add_argument('--games', type=int, default=200, help='load: concurrent games')
+    parser.add_argument('--connections', type=int, default=10, help='load: client connections')
+    parser.add_argument('--plies', type=int, default=40, help='load: max plies per game')
+    parser.add_argument('--engine-every', type=int, default=0, help='load: every n-th move played by engine')
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    with instrument.session(args):
+        if args.mode == 'serve':
+            asyncio.run(serve(args.port or PORT, args.workers, args.time))
+        else:
+            asyncio.run(load_test(args.port, args.games, args.connections, args.plies,
+                                  args.engine_every, args.workers, args.time))
+
+
+if __name__ == '__main__':
+    main()
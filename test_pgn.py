@@ -0,0 +1,27 @@
+import io
+from pgn import read_games, get_sans, replay, load_game
+
+GAME = '''[Event "comments"]
+[Result "*"]
+
+1. e4 e5 ; rest of this line is a comment 2. d4
+2. Nf3 {a comment
+over two lines} Nc6 3. Bb5 (3. Bc4 Bc5) a6 *
+'''
+
+def test_semicolon_comment_ends_at_end_of_line():
+    (tags, movetext), = read_games(io.StringIO(GAME))
+    assert tags == {'Event': 'comments', 'Result': '*'}
+    assert get_sans(movetext) == ['e4', 'e5', 'Nf3', 'Nc6', 'Bb5', 'a6']
+
+def test_replay_plays_every_move():
+    (tags, movetext), = read_games(io.StringIO(GAME))
+    game = load_game(tags)
+    assert replay(game, get_sans(movetext)) == 6
+    assert game.get_fen() == 'r1bqkbnr/1ppp1ppp/p1n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 0 4'
+
+def test_fen_tag_of_finished_game():
+    game = load_game({'FEN': 'rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3'})
+    assert game.checkmate and game.get_result() == '0-1'
+    game = load_game({'FEN': '7k/5Q2/6K1/8/8/8/8/8 b - - 0 1'})
+    assert game.stalemate and not game.checkmate
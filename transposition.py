@@ -0,0 +1,116 @@
+'''
+transposition table - search results of positions keyed by zobrist hash, fixed memory size
+
+entries live in two flat arrays of 64 bit words (key, data) so memory is known up front:
+16 bytes per entry, 2 entries per bucket, bucket count is the largest power of 2 that fits in size_mb.
+slot 0 of a bucket keeps the deepest search (depth-preferred), slot 1 takes everything else (always-replace).
+entries carry the generation (search number) they were stored in - a slot 0 entry of an earlier search
+can be replaced by any result, so deep entries of old games do not hold slot 0 forever.
+
+data word: score (32 bits, offset) | depth (8 bits) | bound (2 bits) | move (16 bits) | generation (6 bits)
+'''
+from array import array
+from constant import *
+from piece import *
+
+EXACT, LOWER, UPPER = 1, 2, 3  # bound of stored score: exact, score >= stored, score <= stored
+
+ENTRY_SIZE = 16  # bytes - key + data word
+BUCKET_SIZE = 2  # entries per bucket
+
+SCORE_OFFSET = 1 << 31
+GENERATIONS = 64  # generation wraps around after this many searches
+PROMOTIONS = [None, 'Q', 'R', 'B', 'N']
+
+
+def encode_move(old_pos, new_pos, promotion=None):
+    '''pack move into 16 bits - from square (6), to square (6), promotion (3), 0 = no move'''
+    old_col, old_row = old_pos
+    new_col, new_row = new_pos
+    return (1 << 15) | (PROMOTIONS.index(promotion) << 12) | ((old_row * COLS + old_col) << 6) | (new_row * COLS + new_col)
+
+def decode_move(move):
+    '''return (old pos, new pos, promotion) of packed move, None for no move'''
+    if move == 0:
+        return None
+    old_sq, new_sq = (move >> 6) & 63, move & 63
+    return (old_sq % COLS, old_sq // COLS), (new_sq % COLS, new_sq // COLS), PROMOTIONS[(move >> 12) & 7]
+
+
+class TranspositionTable:
+    '''fixed size table of search results, size_mb rounded down to a power of 2 buckets'''
+    def __init__(self, size_mb=16):
+        buckets = 1
+        while buckets * 2 * BUCKET_SIZE * ENTRY_SIZE <= size_mb * 1024 * 1024:
+            buckets *= 2
+        self.mask = buckets - 1
+        self.keys = array('Q', bytes(8 * buckets * BUCKET_SIZE))
+        self.data = array('Q', bytes(8 * buckets * BUCKET_SIZE))
+        self.generation = 0
+        self.reset_stats()
+
+    def get_size(self):
+        '''memory used by entries in bytes'''
+        return len(self.keys) * ENTRY_SIZE
+
+    def clear(self):
+        for i in range(len(self.keys)):
+            self.keys[i] = 0
+            self.data[i] = 0
+        self.reset_stats()
+
+    def new_search(self):
+        '''start new generation - entries stored before it become replaceable'''
+        self.generation = (self.generation + 1) % GENERATIONS
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0  # probe missed but bucket held other positions
+        self.stores = 0
+        self.overwrites = 0  # store replaced a different position
+
+    def get_stats(self):
+        used = sum(1 for key in self.keys if key != 0)
+        return {'probes': self.probes, 'hits': self.hits, 'misses': self.probes - self.hits,
+                'collisions': self.collisions, 'stores': self.stores, 'overwrites': self.overwrites,
+                'hit_rate': self.hits / max(self.probes, 1), 'fill': used / len(self.keys)}
+
+
+    def probe(self, key):
+        '''return (depth, score, bound, move) stored for key, None if not in table'''
+        self.probes += 1
+        index = (key & self.mask) * BUCKET_SIZE
+        keys = self.keys
+        for slot in (index, index + 1):
+            if keys[slot] == key:
+                self.hits += 1
+                data = self.data[slot]
+                return (data >> 32) & 255, (data & 0xFFFFFFFF) - SCORE_OFFSET, (data >> 40) & 3, (data >> 42) & 0xFFFF
+        if keys[index] or keys[index + 1]:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, score, bound, move=0):
+        '''
+        store search result - slot 0 takes it if deeper, same position or slot 0 entry is of an
+        earlier search, otherwise slot 1
+        '''
+        self.stores += 1
+        index = (key & self.mask) * BUCKET_SIZE
+        keys, data = self.keys, self.data
+        if keys[index + 1] == key:
+            slot = index + 1
+        elif keys[index] == key or depth >= (data[index] >> 32) & 255 or data[index] >> 58 != self.generation:
+            slot = index
+        else:
+            slot = index + 1
+
+        if keys[slot] != key:
+            if keys[slot] != 0:
+                self.overwrites += 1
+        elif move == 0:
+            move = (data[slot] >> 42) & 0xFFFF  # keep best move of earlier search of position
+        keys[slot] = key
+        data[slot] = ((score + SCORE_OFFSET) | (min(depth, 255) << 32) | (bound << 40) | (move << 42)
+                      | (self.generation << 58))
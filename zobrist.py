@@ -0,0 +1,33 @@
+import random
+from constant import *
+from piece import *
+
+# fixed seed - same keys in every process so hashes can be shared / stored
+_random = random.Random(20210101)
+
+def _key():
+    return _random.getrandbits(64)
+
+# colour -> piece class -> square (row * 8 + col) -> key
+PIECE_KEYS = {colour: {piece_class: [_key() for _ in range(ROWS * COLS)]
+                       for piece_class in (Pawn, Knight, Bishop, Rook, Queen, King)}
+              for colour in ('W', 'B')}
+TURN_KEY = _key()  # xor-ed in when black to move
+CASTLING_KEYS = {right: _key() for right in 'KQkq'}
+EN_PASSANT_KEYS = [_key() for _ in range(COLS)]  # file of pawn that just moved 2 squares
+
+
+def piece_key(piece, pos):
+    col, row = pos
+    return PIECE_KEYS[piece.colour][type(piece)][row * COLS + col]
+
+def castling_key(rights):
+    key = 0
+    for right in rights:
+        key ^= CASTLING_KEYS[right]
+    return key
+
+def en_passant_key(col):
+    if col is None:
+        return 0
+    return EN_PASSANT_KEYS[col]